@@ -0,0 +1,64 @@
+#Description
+'''
+Benchmark of the import time of the ``eotools`` modules.
+Every module is imported in a fresh interpreter (cold import), the best of several runs is reported.
+Heavy dependencies (xarray, rasterio, eodag, matplotlib, ...) are only imported at their first use,
+so the script fails (exit code 1) if a module takes longer than the limit or imports one of them eagerly.
+
+Run from the repository root:
+    python benchmarks/bench_import.py [limit in seconds]
+'''
+
+
+
+#Modules:
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+NOTEBOOKS = Path(__file__).resolve().parents[1] / 'notebooks'
+
+
+MODULES = ['loading', 'contrast', 'geometry', 'regions', 'shortcut', 'classify', 'download', 'catalog']
+HEAVY = ['xarray', 'rasterio', 'eodag', 'matplotlib', 'geopandas', 'sklearn', 'ipywidgets']
+RUNS = 5
+LIMIT = 0.6
+
+CODE = '''
+import sys, json, time
+start = time.perf_counter()
+import eotools.{module}
+duration = time.perf_counter() - start
+print(json.dumps({{'time': duration, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def cold_import(module:str) -> dict:
+    '''
+    Imports ``eotools.<module>`` in a fresh interpreter and returns the import time and the loaded heavy dependencies.
+    '''
+    result = subprocess.run([sys.executable, '-c', CODE.format(module=module, heavy=HEAVY)], cwd=NOTEBOOKS,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+def main():
+    limit = float(sys.argv[1]) if len(sys.argv) > 1 else LIMIT
+    failed = []
+    print(f'{"module":>10} {"time [s]":>9}  eager heavy imports')
+    for module in MODULES:
+        results = [cold_import(module) for _ in range(RUNS)]
+        best = min(result['time'] for result in results)
+        heavy = results[0]['heavy']
+        print(f'{module:>10} {best:>9.3f}  {", ".join(heavy) or "-"}')
+        if best > limit or heavy:
+            failed.append(module)
+
+    if failed:
+        print(f'Import time regression (limit {limit:.2f} s, no eager heavy imports): {", ".join(failed)}')
+        sys.exit(1)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#Description
+'''
+Benchmark of the quantile methods of ``eotools.contrast.quantiles`` used by ``auto_clip``.
+Compares the exact ``np.nanquantile`` with the 'histogram' and 'sample' methods on a synthetic 
+full tile band (10980 x 10980) as uint16 reflectances and as float32 values.
+
+Run from the repository root:
+    python benchmarks/bench_quantiles.py [size]
+'''
+
+
+
+#Modules:
+import sys
+import time
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'notebooks'))
+from eotools.contrast import quantiles
+
+
+PERCENTILE = 0.02
+METHODS = ['exact', 'histogram', 'sample']
+
+
+def make_band(size:int) -> dict:
+    '''
+    Synthetic band with a skewed, reflectance like distribution and some NaNs (float only).
+    '''
+    rng = np.random.default_rng(42)
+    band = np.clip(rng.gamma(2.0, 600.0, (size, size)), 0, 10000)
+    as_float = band.astype(np.float32)
+    as_float[:size // 100] = np.nan
+    return {'uint16': band.astype(np.uint16), 'float32': as_float}
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10980
+    q = [PERCENTILE, 1 - PERCENTILE]
+    print(f'{"dtype":>8} {"method":>10} {"time [s]":>9} {"speedup":>8} {"max error":>10}')
+    for dtype, band in make_band(size).items():
+        results = {}
+        for method in METHODS:
+            start = time.perf_counter()
+            results[method] = quantiles(band, q, method)
+            results[method + '_time'] = time.perf_counter() - start
+        for method in METHODS:
+            error = np.max(np.abs(results[method] - results['exact']))
+            speedup = results['exact_time'] / results[method + '_time']
+            print(f'{dtype:>8} {method:>10} {results[method + "_time"]:>9.2f} {speedup:>7.1f}x {error:>10.3f}')
+
+if __name__ == '__main__':
+    main()
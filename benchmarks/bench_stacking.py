@@ -0,0 +1,74 @@
+#Description
+'''
+Benchmark of the time stacking in ``eotools.loading``.
+Compares ``xr.merge`` with the pre-allocated ``stack_timestamps`` for 10, 50 and 200 timestamps
+of synthetic single-product Datasets on a common grid.
+
+Run from the repository root:
+    python benchmarks/bench_stacking.py
+'''
+
+
+
+#Modules:
+import sys
+import time
+import warnings
+import datetime as dt
+import numpy as np
+import xarray as xr
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'notebooks'))
+from eotools.loading import stack_timestamps
+
+
+BANDS = ['B02', 'B03', 'B04', 'B08']
+# Kept small: xr.merge reindexes every Dataset to the full time axis and needs a lot of memory at 200 timestamps
+SHAPE = (48, 48)
+TIMESTAMPS = [10, 50, 200]
+
+
+def make_datasets(n:int) -> list[xr.Dataset]:
+    '''
+    Create ``n`` single timestamp Datasets with the layout of ``load_single_product_regex``.
+    '''
+    rng = np.random.default_rng(42)
+    y = np.linspace(48.35, 48.1, SHAPE[0])
+    x = np.linspace(16.1, 16.6, SHAPE[1])
+    start = dt.date(2024, 1, 1)
+    datasets = []
+    for i in range(n):
+        date = start + dt.timedelta(days=5*i)
+        data_vars = {band: (('time', 'y', 'x'), rng.integers(0, 10000, (1,) + SHAPE, dtype=np.uint16))
+                     for band in BANDS}
+        datasets.append(xr.Dataset(data_vars, coords={'time': [date], 'y': y, 'x': x, 'spatial_ref': 0}))
+    return datasets
+
+def timeit(func, repeat:int=3) -> float:
+    '''
+    Best wall time of ``repeat`` calls of ``func`` in seconds.
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    # Newer xarray versions warn about changing defaults of xr.merge
+    warnings.simplefilter('ignore', FutureWarning)
+    print(f'{"timestamps":>10} {"xr.merge [s]":>14} {"stack [s]":>12} {"speedup":>8}')
+    for n in TIMESTAMPS:
+        datasets = make_datasets(n)
+        merged = xr.merge(datasets)
+        stacked = stack_timestamps(datasets)
+        xr.testing.assert_identical(merged, stacked)
+
+        t_merge = timeit(lambda: xr.merge(datasets))
+        t_stack = timeit(lambda: stack_timestamps(datasets))
+        print(f'{n:>10} {t_merge:>14.3f} {t_stack:>12.3f} {t_merge / t_stack:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
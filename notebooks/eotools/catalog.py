@@ -0,0 +1,261 @@
+#Description
+'''
+This script is intended to simplify further processes in your code.
+In here you will find all the necessary functions to keep a local SQLite catalog
+of the products in the download directory (``paths.yml``), so that products and band files
+can be looked up without walking the download directory again.
+'''
+
+
+
+#Variables:
+__name__ = 'catalog'
+__version__ = '20-Jun-2024_v01'
+
+
+
+#Modules:
+import os
+import re
+import sqlite3
+import datetime as dt
+from contextlib import closing
+from pathlib import Path
+from .loading import walk_assets, extract_infos_from_filename
+
+
+# Name of the catalog file in the download directory
+CATALOG_FILE = 'eotools_catalog.sqlite'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    tile TEXT,
+    sensing_time TEXT,
+    product_type TEXT,
+    minx REAL, miny REAL, maxx REAL, maxy REAL
+);
+CREATE TABLE IF NOT EXISTS assets (
+    product_id TEXT NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    band TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (product_id, band, resolution)
+);
+CREATE INDEX IF NOT EXISTS idx_products_tile_time ON products (tile, sensing_time);
+CREATE INDEX IF NOT EXISTS idx_products_time ON products (sensing_time);
+CREATE INDEX IF NOT EXISTS idx_assets_band ON assets (band, resolution);
+'''
+
+# Footprint of the product in the metadata file (MTD_MSIL1C.xml / MTD_MSIL2A.xml): "lat lon lat lon ..."
+_FOOTPRINT_PATTERN = re.compile(r'<EXT_POS_LIST>([^<]+)</EXT_POS_LIST>')
+
+
+def _connect(db:str|Path) -> sqlite3.Connection:
+    '''
+    Open the catalog and create the tables if they do not exist yet.
+
+    Params:
+    -------
+        - db: str|Path -> filepath of the SQLite catalog
+
+    Returns:
+    -------
+        - con: sqlite3.Connection
+    '''
+    con = sqlite3.connect(db)
+    con.row_factory = sqlite3.Row
+    con.execute('PRAGMA foreign_keys = ON')
+    con.executescript(_SCHEMA)
+    return con
+
+def read_footprint(root:str|Path) -> tuple[float, float, float, float]|None:
+    '''
+    Read the bounding box of the product footprint from the product metadata file.
+
+    Params:
+    -------
+        - root: str|Path -> root directory of a downloaded product in SAFE format
+
+    Returns:
+    -------
+        - bbox: tuple|None -> (lonmin, latmin, lonmax, latmax) or None if no metadata file was found
+    '''
+    for dirpath, _, files in os.walk(root, topdown=True):
+        for file in files:
+            if file.startswith('MTD_MSI') and file.endswith('.xml'):
+                with open(os.path.join(dirpath, file), 'r') as f:
+                    match = _FOOTPRINT_PATTERN.search(f.read())
+                if match is None:
+                    return None
+                values = [float(v) for v in match.group(1).split()]
+                lats, lons = values[0::2], values[1::2]
+                return min(lons), min(lats), max(lons), max(lats)
+    return None
+
+def _sensing_time(id:str) -> str:
+    '''
+    Sensing time of a product in ISO format, taken from the product id (e.g.: 20240501T100031).
+    '''
+    return dt.datetime.strptime(id.split('_')[2], '%Y%m%dT%H%M%S').isoformat()
+
+def _product_mtime(root:Path) -> float:
+    '''
+    Newest modification time of the directories of the product down to the resolution directories of IMG_DATA.
+    Adding, removing or replacing a band file changes the modification time of its directory 
+    (e.g. GRANULE/*/IMG_DATA/R10m), but not the one of the product directory itself.
+    Only these few directories are stat-ed, the files are not.
+    '''
+    dirs = [root, root / 'GRANULE', *root.glob('GRANULE/*'), *root.glob('GRANULE/*/IMG_DATA'), 
+            *root.glob('GRANULE/*/IMG_DATA/*')]
+    return max(os.stat(path).st_mtime for path in dirs if path.is_dir())
+
+def _product_id(root:Path) -> str:
+    '''
+    Id of a product as used by eodag (``properties['id']``), i.e. the directory name without the .SAFE suffix.
+    '''
+    return root.name.removesuffix('.SAFE')
+
+def _index_product(con:sqlite3.Connection, root:Path, mtime:float) -> None:
+    '''
+    Add (or replace) a single product and its band files in the catalog.
+    '''
+    id = _product_id(root)
+    infos = extract_infos_from_filename(id)
+    bbox = read_footprint(root) or (None, None, None, None)
+
+    con.execute('DELETE FROM products WHERE id = ?', (id,))
+    con.execute('INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (id, str(root), mtime, infos['tile'], _sensing_time(id), infos['product_type'], *bbox))
+    con.executemany('INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?)',
+                    [(id, band, res, path) for band, res, path in walk_assets(root)])
+
+def update_catalog(download_dir:str|Path, db:str|Path=None, log:bool=True) -> Path:
+    '''
+    Index the products of the download directory.
+    Only new products and products with changed files (see ``_product_mtime``) are scanned,
+    products which have been removed from the download directory are removed from the catalog.
+
+    Params:
+    -------
+        - download_dir: str|Path -> download directory (``workspace['download']``)
+        - db: str|Path -> filepath of the catalog (defaults to ``CATALOG_FILE`` in the download directory)
+        - log: bool -> if True, print the number of scanned and removed products
+
+    Returns:
+    -------
+        - db: Path -> filepath of the catalog
+    '''
+    download_dir = Path(download_dir)
+    db = Path(db) if db is not None else download_dir / CATALOG_FILE
+
+    # Product directories follow the naming convention <platform>_<instrument><product_level>_...
+    on_disk = {_product_id(entry): entry for entry in download_dir.iterdir()
+               if entry.is_dir() and '_MSIL' in entry.name}
+
+    with closing(_connect(db)) as con, con:
+        known = {row['id']: row['mtime'] for row in con.execute('SELECT id, mtime FROM products')}
+
+        removed = [id for id in known if id not in on_disk]
+        con.executemany('DELETE FROM products WHERE id = ?', [(id,) for id in removed])
+
+        scanned = 0
+        for id, root in on_disk.items():
+            mtime = _product_mtime(root)
+            if known.get(id) == mtime:
+                continue
+            _index_product(con, root, mtime)
+            scanned += 1
+
+    if log:
+        print(f'Catalog updated: {scanned} products scanned, {len(removed)} removed, {len(on_disk)} products in total.')
+    return db
+
+def query_products(db:str|Path, tile:str=None, product_type:str=None, start:str=None, end:str=None,
+                   bbox:tuple=None) -> list[dict]:
+    '''
+    Query the products of the catalog.
+
+    Params:
+    -------
+        - db: str|Path -> filepath of the catalog
+        - tile: str -> tile identifier (e.g.: '33UXP')
+        - product_type: str -> product type (e.g.: 'S2_MSI_L2A')
+        - start: str -> first sensing date (e.g.: '2024-05-01'), inclusive
+        - end: str -> last sensing date (e.g.: '2024-06-01'), exclusive
+        - bbox: tuple -> (lonmin, latmin, lonmax, latmax), only products whose footprint intersects the bbox
+
+    Returns:
+    -------
+        - products: list[dict] -> one dictionary per product, sorted by sensing time
+    '''
+    where, params = _product_filter(tile, product_type, start, end, bbox)
+    with closing(_connect(db)) as con:
+        rows = con.execute(f'SELECT * FROM products p {where} ORDER BY p.sensing_time', params).fetchall()
+    return [dict(row) for row in rows]
+
+def query_assets(db:str|Path, band:str=None, resolution:int=None, tile:str=None, product_type:str=None,
+                 start:str=None, end:str=None, bbox:tuple=None, product_id:str=None) -> list[dict]:
+    '''
+    Query the band files of the catalog (e.g.: all B04 10m files for tile 33UXP in May).
+
+    Params:
+    -------
+        - db: str|Path -> filepath of the catalog
+        - band: str -> band name (e.g.: 'B04')
+        - resolution: int -> native resolution in m (10, 20, 60)
+        - tile, product_type, start, end, bbox: -> product filters (see ``query_products``)
+        - product_id: str -> id of a single product (directory name without .SAFE)
+
+    Returns:
+    -------
+        - assets: list[dict] -> one dictionary per file with the keys
+          ``product_id``, ``band``, ``resolution``, ``path``, ``tile`` and ``sensing_time``
+    '''
+    where, params = _product_filter(tile, product_type, start, end, bbox)
+    if band is not None:
+        where += (' AND ' if where else 'WHERE ') + 'a.band = ?'
+        params.append(band)
+    if resolution is not None:
+        where += (' AND ' if where else 'WHERE ') + 'a.resolution = ?'
+        params.append(resolution)
+    if product_id is not None:
+        where += (' AND ' if where else 'WHERE ') + 'a.product_id = ?'
+        params.append(product_id)
+
+    query = f'''
+        SELECT a.product_id, a.band, a.resolution, a.path, p.tile, p.sensing_time
+        FROM assets a JOIN products p ON p.id = a.product_id
+        {where}
+        ORDER BY p.sensing_time, a.band, a.resolution
+    '''
+    with closing(_connect(db)) as con:
+        rows = con.execute(query, params).fetchall()
+    return [dict(row) for row in rows]
+
+def _product_filter(tile:str=None, product_type:str=None, start:str=None, end:str=None,
+                    bbox:tuple=None) -> tuple[str, list]:
+    '''
+    Build the WHERE clause on the products table (alias ``p``) for the query functions.
+    '''
+    conditions, params = [], []
+    if tile is not None:
+        conditions.append('p.tile = ?')
+        params.append(tile.lstrip('T'))
+    if product_type is not None:
+        conditions.append('p.product_type = ?')
+        params.append(product_type)
+    if start is not None:
+        conditions.append('p.sensing_time >= ?')
+        params.append(start)
+    if end is not None:
+        conditions.append('p.sensing_time < ?')
+        params.append(end)
+    if bbox is not None:
+        lonmin, latmin, lonmax, latmax = bbox
+        conditions.append('p.minx <= ? AND p.maxx >= ? AND p.miny <= ? AND p.maxy >= ?')
+        params.extend([lonmax, lonmin, latmax, latmin])
+    where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+    return where, params
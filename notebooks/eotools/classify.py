@@ -0,0 +1,162 @@
+#Description
+'''
+This script is intended to simplify further processes in your code.
+In here you will find all the necessary functions to apply a trained classifier
+(e.g. from ``preprocess_data_to_classify``) to a whole scene, window by window,
+and to write the resulting class map as GeoTIFF.
+'''
+
+
+
+from __future__ import annotations
+
+#Variables:
+__name__ = 'classify'
+__version__ = '20-Jun-2024_v01'
+
+
+
+#Modules:
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .lazy import lazy_import
+
+# Heavy dependencies are imported at their first use (``rioxarray`` inside of the functions which use ``.rio``)
+xr = lazy_import('xarray')
+rasterio = lazy_import('rasterio')
+rio_windows = lazy_import('rasterio.windows')
+
+
+# Default memory budget for the windows which are processed at the same time
+MEMORY_LIMIT = 2*1024**3
+
+
+def window_rows(ds:xr.Dataset, bands:list, memory_limit:int=MEMORY_LIMIT, workers:int=1) -> int:
+    '''
+    Number of rows of a window (full width strips), so that all windows processed at the same time fit into the memory limit.
+    Per pixel the window holds the values of all bands and timestamps, the float64 features and the prediction.
+
+    Params:
+    -------
+        - ds: xr.Dataset -> Dataset to classify
+        - bands: list -> bands used as features
+        - memory_limit: int -> memory budget in bytes for all workers together
+        - workers: int -> number of windows processed at the same time
+
+    Returns:
+    -------
+        - rows: int
+    '''
+    n_time = ds.sizes.get('time', 1)
+    per_pixel = sum(n_time * ds[band].dtype.itemsize for band in bands) + len(bands) * 8 * 2 + 8
+    pixels = memory_limit // (workers * per_pixel)
+    return int(max(1, min(ds.sizes['y'], pixels // ds.sizes['x'])))
+
+def window_features(ds:xr.Dataset, bands:list, rows:slice) -> np.ndarray:
+    '''
+    Features of a window (rows of the Dataset) in the layout of ``preprocess_data_to_classify``:
+    median over time of every band, one row per pixel and one column per band.
+
+    Params:
+    -------
+        - ds: xr.Dataset -> Dataset to classify
+        - bands: list -> bands used as features
+        - rows: slice -> rows of the window
+
+    Returns:
+    -------
+        - X: np.ndarray -> features with shape (pixels, bands)
+    '''
+    window = ds[bands].isel(y=rows)
+    if 'time' in window.dims:
+        window = window.median(dim='time', skipna=True)
+    values = window.to_array(dim='band').transpose('y', 'x', 'band').values
+    return values.reshape(-1, len(bands)).astype(np.float64, copy=False)
+
+def predict_window(model, ds:xr.Dataset, bands:list, rows:slice, batch_size:int=None,
+                   nodata:int=255, dtype=np.uint8) -> np.ndarray:
+    '''
+    Classify a single window. Pixels with NaN values in any band are set to nodata.
+
+    Params:
+    -------
+        - model: trained classifier with a ``predict`` method
+        - ds: xr.Dataset -> Dataset to classify
+        - bands: list -> bands used as features (same order as for training)
+        - rows: slice -> rows of the window
+        - batch_size: int -> maximum number of pixels per ``predict`` call (default: all valid pixels of the window)
+        - nodata: int -> value for pixels which could not be classified
+        - dtype: -> dtype of the class map
+
+    Returns:
+    -------
+        - classes: np.ndarray -> class map of the window with shape (rows, x)
+    '''
+    X = window_features(ds, bands, rows)
+    valid = ~np.isnan(X).any(axis=1)
+    classes = np.full(X.shape[0], nodata, dtype=dtype)
+
+    X = X[valid]
+    batch_size = batch_size or max(1, len(X))
+    predictions = [model.predict(X[start:start + batch_size]) for start in range(0, len(X), batch_size)]
+    if predictions:
+        classes[valid] = np.concatenate(predictions)
+    return classes.reshape(-1, ds.sizes['x'])
+
+def predict_dataset(model, ds:xr.Dataset, bands:list=None, path:str=None, workers:int=1, memory_limit:int=MEMORY_LIMIT,
+                    batch_size:int=None, nodata:int=255, dtype=np.uint8) -> xr.DataArray:
+    '''
+    Apply a trained classifier to a whole Dataset, window by window.
+    The Dataset is split into full width strips whose size is derived from the memory limit,
+    the windows are classified by a pool of threads (only ``workers`` windows are in memory at the same time)
+    and the class map is written window by window to a GeoTIFF with the CRS and transform of the Dataset.
+    Dask-backed Datasets (e.g. ``load_multiple_timestamps_regex(..., lazy=True)``) are only read window by window.
+
+    Params:
+    -------
+        - model: trained classifier with a ``predict`` method (e.g. sklearn.ensemble.RandomForestClassifier)
+        - ds: xr.Dataset -> Dataset with the dimensions (time,) y and x
+        - bands: list -> bands used as features, in the same order as for training (default: all data variables)
+        - path: str -> filepath of the GeoTIFF, if None the class map is only returned
+        - workers: int -> number of windows classified at the same time
+        - memory_limit: int -> memory budget in bytes for all windows processed at the same time (default: 2 GB)
+        - batch_size: int -> maximum number of pixels per ``predict`` call
+        - nodata: int -> value for pixels which could not be classified (NaN in any band)
+        - dtype: -> dtype of the class map (default: uint8)
+
+    Returns:
+    -------
+        - classes: xr.DataArray -> class map with the coordinates y and x of the Dataset
+    '''
+    import rioxarray
+    if bands is None:
+        bands = list(ds.data_vars)
+    height, width = ds.sizes['y'], ds.sizes['x']
+    rows = window_rows(ds, bands, memory_limit, workers)
+    windows = [slice(start, min(start + rows, height)) for start in range(0, height, rows)]
+
+    classes = np.full((height, width), nodata, dtype=dtype)
+    dst = None
+    if path is not None:
+        dst = rasterio.open(path, 'w', driver='GTiff', height=height, width=width, count=1, dtype=np.dtype(dtype).name,
+                            crs=ds.rio.crs, transform=ds.rio.transform(), nodata=nodata, compress='deflate')
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Windows are submitted in groups of ``workers``, so the memory limit holds for the windows in flight
+            for group in range(0, len(windows), workers):
+                group_windows = windows[group:group + workers]
+                futures = [pool.submit(predict_window, model, ds, bands, window, batch_size, nodata, dtype)
+                           for window in group_windows]
+                for window, future in zip(group_windows, futures):
+                    result = future.result()
+                    classes[window] = result
+                    if dst is not None:
+                        dst.write(result, 1, window=rio_windows.Window(0, window.start, width, window.stop - window.start))
+    finally:
+        if dst is not None:
+            dst.close()
+
+    class_map = xr.DataArray(classes, dims=('y', 'x'), coords={'y': ds['y'], 'x': ds['x']}, name='classes')
+    if ds.rio.crs is not None:
+        class_map = class_map.rio.write_crs(ds.rio.crs).rio.write_nodata(nodata)
+    return class_map
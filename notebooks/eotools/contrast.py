@@ -7,6 +7,8 @@ and contrasts of your produced tif images.
 
 
 
+from __future__ import annotations
+
 #Variables:
 __name__ = 'contrast'
 __version__ = '20-Jun-2024_v01'
@@ -15,17 +17,21 @@ __version__ = '20-Jun-2024_v01'
 
 #Modules:
 import numpy as np
-import matplotlib.pyplot as plt
 from numpy import ndarray
-import xarray as xr
+from .lazy import lazy_import
+
+# Heavy dependencies are imported at their first use
+plt = lazy_import('matplotlib.pyplot')
+xr = lazy_import('xarray')
 
 
 
 #Functions
-def auto_clip(I:ndarray, percentile:float=0.02, pooled:bool=True) -> ndarray:
+def auto_clip(I:ndarray, percentile:float=0.02, pooled:bool=True, method:str='exact', inplace:bool=True,
+              dtype=None) -> ndarray:
     """ 
     Calculates the quantiles of I using the percentile parameter and clips the values using the clip function defined below.
-    Modifies I
+    Modifies I (unless inplace=False or a different dtype is given)
     
     Params:
     ----------
@@ -37,6 +43,9 @@ def auto_clip(I:ndarray, percentile:float=0.02, pooled:bool=True) -> ndarray:
                 (default, use this to keep the relative intensities of the bands for natural looking images)    
                 if False, computes the percentiles for each band individually
                 (use this - in conjunction with stretch - to bring the different bands into a comparable range, e.g. for false colour images)
+        - method : str, optional
+            How the quantiles are computed (see ``quantiles``): 'exact' (default), 'histogram' or 'sample'.
+        - inplace, dtype : see ``clip``
         
     
     Returns:
@@ -44,22 +53,153 @@ def auto_clip(I:ndarray, percentile:float=0.02, pooled:bool=True) -> ndarray:
         - np.array : Auto-clipped image data.
     
     """
+    v_min, v_max = _clip_bounds(I, percentile, pooled, method)
+    return clip(I, v_min, v_max, inplace, dtype)        
+
+def _clip_bounds(I:ndarray, percentile:float, pooled:bool, method:str='exact') -> tuple:
+    """
+    Computes the lower and upper clipping boundaries of I.
+    Both quantiles are computed with a single call, so every band is only partitioned once.
+
+    Params:
+    ----------
+        - I : np.array(rows, cols, bands)
+            Image array.
+        - percentile : float
+            Percentile defining the clipping boundaries of I in terms of its distribution.
+        - pooled: if True, computes the pooled percentile over all bands, if False for each band individually
+        - method : str
+            How the quantiles are computed (see ``quantiles``).
+
+    Returns:
+    -------
+        - (v_min, v_max) : scalars (pooled) or arrays with one value per band
+    """
+    q = [percentile, 1 - percentile]
     if pooled:
-        v_min = np.nanquantile(I, percentile)
-        v_max = np.nanquantile(I, 1 - percentile)
- 
+        v_min, v_max = quantiles(I, q, method)
     else:
         tmp = I.reshape(-1, I.shape[-1]) #collapes image x,y 2d-array into a 1d-array
-        v_min = np.nanquantile(tmp, percentile, axis=0)
-        v_max = np.nanquantile(tmp, 1 - percentile, axis=0)
-        
-    return clip(I, v_min, v_max)        
+        if method == 'exact':
+            v_min, v_max = np.nanquantile(tmp, q, axis=0)
+        else:
+            v_min, v_max = np.stack([quantiles(tmp[:, band], q, method) for band in range(tmp.shape[-1])], axis=-1)
+    return v_min, v_max
+
+# Number of bins of the 'histogram' method for floating point images
+HISTOGRAM_BINS = 4096
+# Number of randomly drawn pixels of the 'sample' method
+SAMPLE_SIZE = 1_000_000
+# Number of values processed at once when counting histograms
+_BLOCK_SIZE = 2**22
+# Integer images with a value range up to this size are counted per value (histograms of dask arrays and plots)
+_MAX_INTEGER_BINS = 2**16
+
+def quantiles(values:ndarray, q:list, method:str='exact') -> ndarray:
+    """
+    Computes quantiles of all values (NaNs are ignored), exactly or approximated.
+
+    Methods and error bounds (compared to ``np.nanquantile``):
+        - 'exact': ``np.nanquantile`` (sorts/partitions all values)
+        - 'histogram': one counting pass over the values. 
+                Integer images (e.g. uint16 reflectances) with a value range up to ``_MAX_INTEGER_BINS`` are counted 
+                per DN, which gives the exact quantile. Larger value ranges are counted like floating point images.
+                Floating point images are counted in ``HISTOGRAM_BINS`` bins between min and max,
+                the error is at most one bin width: (max - min) / HISTOGRAM_BINS.
+        - 'sample': ``np.nanquantile`` of ``SAMPLE_SIZE`` randomly drawn values (fixed seed).
+                By the Dvoretzky-Kiefer-Wolfowitz inequality, the returned value lies between the exact 
+                quantiles of q - eps and q + eps with eps = sqrt(ln(2/delta) / (2 * SAMPLE_SIZE)),
+                i.e. eps = 0.0019 for a probability of 1 - delta = 99.9%.
 
-def clip(I:ndarray, v_min:float, v_max:float) -> ndarray:
+    Params:
+    ----------
+        - values : np.array
+            Values of any shape.
+        - q : list
+            Quantiles to compute (between 0 and 1).
+        - method : str
+            'exact', 'histogram' or 'sample'.
+
+    Returns:
+    -------
+        - np.array : One value per quantile.
+    """
+    if method == 'exact':
+        return np.nanquantile(values, q)
+    elif method == 'histogram':
+        if np.issubdtype(values.dtype, np.integer):
+            return _integer_quantiles(values, q)
+        return _histogram_quantiles(values, q)
+    elif method == 'sample':
+        flat = _flatten(values)
+        if flat.size <= SAMPLE_SIZE:
+            return np.nanquantile(flat, q)
+        idx = np.random.default_rng(42).integers(0, flat.size, SAMPLE_SIZE)
+        return np.nanquantile(flat[idx], q)
+    else:
+        raise ValueError(f"method must be 'exact', 'histogram' or 'sample', got {method!r}.")
+
+def _flatten(values:ndarray) -> ndarray:
+    """
+    1d-array of the values. Bands of ``_clip_bounds`` (strided columns) are used as they are, 
+    since reshaping them would copy the band.
+    """
+    return values if values.ndim == 1 else values.reshape(-1)
+
+def _integer_quantiles(values:ndarray, q:list) -> ndarray:
+    """
+    Exact (linearly interpolated) quantiles of an integer array from its counts per value.
+    Value ranges larger than ``_MAX_INTEGER_BINS`` are approximated with ``_histogram_quantiles``.
+    """
+    flat = _flatten(values)
+    offset, v_max = int(flat.min()), int(flat.max())
+    if v_max - offset >= _MAX_INTEGER_BINS:
+        return _histogram_quantiles(flat, q)
+    counts = np.zeros(v_max - offset + 1, dtype=np.int64)
+    for start in range(0, flat.size, _BLOCK_SIZE):
+        block = flat[start:start + _BLOCK_SIZE]
+        counts += np.bincount(block.astype(np.int64) - offset if offset else block, minlength=counts.size)
+    return _counts_quantiles(counts, q, offset, 1, discrete=True)
+
+def _histogram_quantiles(values:ndarray, q:list) -> ndarray:
+    """
+    Approximated quantiles of a floating point array from a histogram with ``HISTOGRAM_BINS`` bins.
+    """
+    flat = _flatten(values)
+    v_min, v_max = np.nanmin(flat), np.nanmax(flat)
+    if v_min == v_max:
+        return np.full(len(q), v_min, dtype=np.float64)
+
+    counts = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    for start in range(0, flat.size, _BLOCK_SIZE):
+        # NaNs are outside of the range and therefore not counted
+        counts += np.histogram(flat[start:start + _BLOCK_SIZE], bins=HISTOGRAM_BINS, range=(v_min, v_max))[0]
+    return _counts_quantiles(counts, q, v_min, (v_max - v_min) / HISTOGRAM_BINS, discrete=False)
+
+def _counts_quantiles(counts:ndarray, q:list, start:float, width:float, discrete:bool) -> ndarray:
+    """
+    Quantiles from the counts of a histogram with equally wide bins, the first bin starts at ``start``.
+    If ``discrete``, every bin holds a single value (integer counts) and the quantiles are exact,
+    otherwise they are interpolated linearly inside the bin which contains the rank.
+    """
+    cdf = np.cumsum(counts)
+    # Position in the sorted values as used by np.quantile (linear interpolation)
+    rank = np.asarray(q, dtype=np.float64) * (cdf[-1] - 1)
+    if discrete:
+        lower = np.searchsorted(cdf, np.floor(rank), side='right')
+        upper = np.searchsorted(cdf, np.ceil(rank), side='right')
+        return start + (lower + (upper - lower) * (rank - np.floor(rank))) * width
+
+    bins = np.searchsorted(cdf, rank, side='right')
+    below = np.where(bins > 0, cdf[np.maximum(bins - 1, 0)], 0)
+    fraction = (rank - below + 0.5) / counts[bins]
+    return start + (bins + np.clip(fraction, 0, 1)) * width
+
+def clip(I:ndarray, v_min:float, v_max:float, inplace:bool=True, dtype=None) -> ndarray:
     """ 
     Performs clipping (dt. "Histogrammbegrenzung")
     Sets all values in I that are outside of [v_min, v_max] to the corresponding boundary.
-    Modifies I
+    Modifies I (unless inplace=False or a different dtype is given)
     
     Params:
     ----------
@@ -69,15 +209,23 @@ def clip(I:ndarray, v_min:float, v_max:float) -> ndarray:
             Lower clipping boundary for each band
         - v_max : scalar or array
             lower clipping boundary for each band
+        - inplace : bool, optional
+            If True (default), I is modified. If False, a copy of I is clipped and I is left unchanged.
+        - dtype : optional
+            Convert I to this dtype first (e.g. np.float32 for uint16 images). The conversion is the only copy,
+            so I is never modified in this case.
     
     Returns:
     -------
         - np.array : Clipped image data.
         
     """
-        
+    I = _working_array(I, inplace, dtype)
     tmp = I.reshape(-1, I.shape[-1]) #collapes image x,y 2d-array into a 1d-array         
-    if np.isscalar(v_min):
+    if np.issubdtype(tmp.dtype, np.floating):
+        # Single pass without temporary boolean masks, NaNs are kept
+        np.clip(tmp, v_min, v_max, out=tmp)
+    elif np.isscalar(v_min):
         tmp[tmp < v_min] = v_min
         tmp[tmp > v_max] = v_max
     else:
@@ -88,13 +236,21 @@ def clip(I:ndarray, v_min:float, v_max:float) -> ndarray:
     
     return I
 
-def stretch(I:ndarray, p_min:float, p_max:float, pooled:bool=True) -> ndarray:
+def _working_array(I:ndarray, inplace:bool, dtype) -> ndarray:
+    """
+    Array the in place functions work on: I itself (inplace) or a single copy of I (converted to dtype).
+    """
+    if dtype is not None and np.dtype(dtype) != I.dtype:
+        return I.astype(dtype)
+    return I if inplace else I.copy()
+
+def stretch(I:ndarray, p_min:float, p_max:float, pooled:bool=True, inplace:bool=True, dtype=None) -> ndarray:
     """
     Performs histogram stretching or normalisation (dt. "Spreizung")
     Computes and applies an affine transformation of values in I to the range [p_min, p_max]. 
     For floating point images to be displayed with pylab.imshow(), p_min=0, p_max=1
     should be chosen.
-    Modifies I
+    Modifies I (unless inplace=False or a different dtype is given)
     
     Params:
     ----------
@@ -106,12 +262,15 @@ def stretch(I:ndarray, p_min:float, p_max:float, pooled:bool=True) -> ndarray:
             Upper  boundary of the output range.
         - pooled: if True, the transformation is computed for and applied to all bands simultaneously  
                 if False, -"- to the individual bands separately
+        - inplace, dtype : see ``clip``. 
+                Use a floating point dtype (e.g. np.float32) for integer images, otherwise the result is truncated to integers.
 
     Returns:
     -------
         - np.array : Normalised image data within the range [p_min, p_max].
     
     """
+    I = _working_array(I, inplace, dtype)
     tmp = I.reshape(-1, I.shape[-1]) #collapes image x,y 2d-array into a 1d-array   
 
     if pooled:    
@@ -123,13 +282,157 @@ def stretch(I:ndarray, p_min:float, p_max:float, pooled:bool=True) -> ndarray:
         q_min = np.nanmin(tmp, axis = 0)
         q_max = np.nanmax(tmp, axis = 0)        
 
-    tmp[:] =  (p_max - p_min) * (tmp - q_min) / (q_max - q_min) + p_min
+    if np.issubdtype(tmp.dtype, np.floating):
+        # Same affine transformation, but in place without temporary arrays
+        tmp -= q_min
+        tmp *= (p_max - p_min) / (q_max - q_min)
+        tmp += p_min
+    else:
+        tmp[:] =  (p_max - p_min) * (tmp - q_min) / (q_max - q_min) + p_min
     return I
 
-def histogram(data:xr.DataArray|ndarray, nbins:int=256, alpha:float=0.5, figsize:tuple=(5,5),
-              title:str='Histogram', xlim:float|int=None, ylim:float|int=None, **kwargs) -> None:
+def auto_clip_stretch(I:ndarray, percentile:float=0.02, p_min:float=0, p_max:float=1, pooled:bool=True,
+                      dtype=np.float32, block_size:int=2**18, method:str='exact', inplace:bool=True) -> ndarray:
+    """
+    Fused version of ``auto_clip`` followed by ``stretch``.
+    Both quantiles are computed with a single partition per band and the clipping and the affine 
+    transformation are applied block by block in one pass over the image.
+    After clipping the minimum and maximum of the image are the quantiles themselves, so the 
+    extra nanmin/nanmax pass of ``stretch`` is not needed.
+    Floating point images (e.g. float32) are modified in place (unless inplace=False), 
+    other images are converted to ``dtype`` first.
+
+    Params:
+    ----------
+        - I : np.array(rows, cols, bands)
+            Image array.
+        - percentile : float, optional
+            Percentile defining the clipping boundaries of I in terms of its distribution (defaults to 0.02).
+        - p_min : number
+            Lower boundary of the output range.
+        - p_max : number
+            Upper boundary of the output range.
+        - pooled: if True, quantiles and transformation are computed over all bands
+                if False, for each band individually
+        - dtype: dtype used for non floating point images (defaults to float32)
+        - block_size: number of pixels processed at once (small enough to stay in the CPU cache)
+        - method: how the quantiles are computed (see ``quantiles``): 'exact' (default), 'histogram' or 'sample'
+        - inplace: if False, floating point images are copied once instead of being modified
+
+    Returns:
+    -------
+        - np.array : Clipped and normalised image data within the range [p_min, p_max].
+    
+    """
+    # Integer images are counted before the conversion, so the 'histogram' method is exact for them
+    v_min, v_max = _clip_bounds(I, percentile, pooled, method)
+
+    I = _working_array(I, inplace, None if np.issubdtype(I.dtype, np.floating) else dtype)
+
+    # Affine transformation of [v_min, v_max] to [p_min, p_max]
+    scale, offset = _affine(v_min, v_max, p_min, p_max)
+    lower, upper = min(p_min, p_max), max(p_min, p_max)
+
+    tmp = I.reshape(-1, I.shape[-1]) #collapes image x,y 2d-array into a 1d-array
+    for start in range(0, tmp.shape[0], block_size):
+        block = tmp[start:start + block_size]
+        block *= scale
+        block += offset
+        np.clip(block, lower, upper, out=block)
+    return I
+
+def _histogram_bands(data:xr.DataArray|ndarray) -> list:
+    '''
+    Split the data into the bands which are drawn as separate histograms:
+    2D data is a single band, the bands of a np.ndarray are on the last axis, of a xr.DataArray on the first axis.
+    '''
+    if type(data) == xr.DataArray:
+        # Keeps dask-backed DataArrays lazy
+        arr = data.data
+    elif type(data) == ndarray:
+        arr = data
+    else:
+        raise TypeError('The data should be either a xr.Dataset or a np.ndarray')
+
+    if len(arr.shape) == 2:
+        return [arr]
+    elif type(data) == ndarray:
+        return [arr[:, :, band] for band in range(arr.shape[-1])]
+    return [arr[band] for band in range(arr.shape[0])]
+
+def compute_histogram(data:xr.DataArray|ndarray, nbins:int=256) -> tuple[ndarray, ndarray]:
+    '''
+    Compute the histogram counts of every band once, to be drawn with ``histogram(hist=...)``.
+    The bins are the same as in ``histogram``: nbins equally spaced edges between the minimum and maximum of all bands.
+        - integer bands (e.g. uint16 DNs) are counted per DN with ``np.bincount`` and the DN counts are summed per bin
+        - floating point bands are counted block by block with ``np.histogram`` (no flattened copy of the band)
+        - dask-backed DataArrays are counted chunk by chunk with ``da.histogram``
+
+    Params:
+    -------
+        - data: xr.DataArray|np.ndarray -> data as passed to ``histogram``
+        - nbins: int -> number of bin edges (default=256)
+
+    Returns:
+    -------
+        - counts: np.ndarray -> counts with shape (bands, nbins - 1)
+        - edges: np.ndarray -> bin edges with shape (nbins,)
+    '''
+    bands = _histogram_bands(data)
+
+    if not isinstance(bands[0], ndarray):
+        import dask
+        import dask.array as da
+
+        mins, maxs = dask.compute([da.nanmin(b) for b in bands], [da.nanmax(b) for b in bands])
+        v_min, v_max = min(mins), max(maxs)
+        edges = np.linspace(v_min, v_max, nbins)
+        counts = dask.compute(*[da.histogram(b, bins=nbins - 1, range=(v_min, v_max))[0] for b in bands])
+        return np.stack(counts), edges
+
+    v_min = min(np.nanmin(b) for b in bands)
+    v_max = max(np.nanmax(b) for b in bands)
+    edges = np.linspace(v_min, v_max, nbins)
+
+    counts = np.zeros((len(bands), nbins - 1), dtype=np.int64)
+    for i, band in enumerate(bands):
+        if np.issubdtype(band.dtype, np.integer) and v_max - v_min < _MAX_INTEGER_BINS:
+            counts[i] = _integer_histogram(band, edges)
+        else:
+            for block in _blocks(band):
+                # NaNs are outside of the range and therefore not counted
+                counts[i] += np.histogram(block, bins=nbins - 1, range=(v_min, v_max))[0]
+    return counts, edges
+
+def _blocks(band:ndarray):
+    '''
+    Iterate over blocks of rows with about ``_BLOCK_SIZE`` values each (views, no copies).
+    '''
+    rows = max(1, _BLOCK_SIZE // max(1, band[0].size))
+    for start in range(0, band.shape[0], rows):
+        yield band[start:start + rows]
+
+def _integer_histogram(band:ndarray, edges:ndarray) -> ndarray:
+    '''
+    Histogram of an integer band: the band is counted per DN and the DN counts are summed per bin
+    (same bin assignment as ``np.histogram``, the last bin includes the right edge).
+    '''
+    offset = int(edges[0])
+    dn_counts = np.zeros(int(edges[-1]) - offset + 1, dtype=np.int64)
+    for block in _blocks(band):
+        block = block.reshape(-1)
+        dn_counts += np.bincount(block.astype(np.int64) - offset if offset else block, minlength=dn_counts.size)
+
+    dns = np.arange(offset, offset + dn_counts.size)
+    bins = np.minimum(np.searchsorted(edges, dns, side='right') - 1, len(edges) - 2)
+    return np.bincount(bins, weights=dn_counts, minlength=len(edges) - 1).astype(np.int64)
+
+def histogram(data:xr.DataArray|ndarray=None, nbins:int=256, alpha:float=0.5, figsize:tuple=(5,5),
+              title:str='Histogram', xlim:float|int=None, ylim:float|int=None, hist:tuple=None, **kwargs) -> None:
     '''
     Plot the histogram of the dataset.
+    The counts are computed with ``compute_histogram`` and drawn as one step line per band (``ax.stairs``).
+    To draw the same data several times (e.g. with different limits), compute the histogram once and pass it with ``hist``.
 
     Params:
     -------
@@ -140,22 +443,15 @@ def histogram(data:xr.DataArray|ndarray, nbins:int=256, alpha:float=0.5, figsize
         - title: str -> title of the plot
         - xlim: float|int -> x-axis limits
         - ylim: float|int -> y-axis limits
+        - hist: tuple -> precomputed (counts, edges) from ``compute_histogram``, data and nbins are ignored then
     
     Returns:
     -------
         - None
         - Shows the histogram plot
     '''
-    #Flatten
-    if type(data) == xr.DataArray:
-        arr = data.values
-    elif type(data) == ndarray:
-        arr = data
-    else:
-        raise TypeError('The data should be either a xr.Dataset or a np.ndarray')
-
     # You can set the number of bins and alpha individually
-    mbins = np.linspace(np.nanmin(arr), np.nanmax(arr), nbins)
+    counts, edges = hist if hist is not None else compute_histogram(data, nbins)
 
     colors=['red', 'green', 'blue', 'C0', 'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'C8', 'C9']
 
@@ -165,17 +461,8 @@ def histogram(data:xr.DataArray|ndarray, nbins:int=256, alpha:float=0.5, figsize
     else:
         fig, ax = plt.subplots(figsize=figsize)
 
-    if len(arr.shape) == 2:
-        flat = arr.flatten()
-        ax.hist(flat, color=colors[0], bins=mbins, alpha=alpha, zorder=0)
-    elif type(data) == ndarray:
-        for color in range(arr.shape[-1]):
-            flat = arr[:, :, color].flatten()
-            ax.hist(flat, color=colors[color], bins=mbins, alpha=alpha, zorder=color)
-    else:
-        for color in range(arr.shape[0]):
-            flat = arr[color, :, :].flatten()
-            ax.hist(flat, color=colors[color], bins=mbins, alpha=alpha, zorder=color)
+    for color, band_counts in enumerate(counts):
+        ax.stairs(band_counts, edges, fill=True, color=colors[color], alpha=alpha, zorder=color)
     ax.set_xlim(xlim)
     ax.set_ylim(ylim)
 
@@ -186,7 +473,8 @@ def histogram(data:xr.DataArray|ndarray, nbins:int=256, alpha:float=0.5, figsize
     plt.show()
 
 
-def auto_clip_dataarray(dataarray: xr.DataArray, percentile: float = 0.02, pooled: bool = True) -> xr.DataArray:
+def auto_clip_dataarray(dataarray: xr.DataArray, percentile: float = 0.02, pooled: bool = True, method: str = 'exact',
+                        inplace: bool = False, dtype=None) -> xr.DataArray:
     '''
     This function clips the values of a DataArray using the auto_clip function.
 
@@ -196,23 +484,43 @@ def auto_clip_dataarray(dataarray: xr.DataArray, percentile: float = 0.02, poole
         - percentile: float -> percentile defining the clipping boundaries of I in terms of its distribution (defaults to 0.02)
         - pooled: bool -> if True, computes the pooled percentile over all bands
                           if False, computes the percentiles for each band individually
+        - method: str -> how the quantiles are computed: 'exact' (default), 'histogram' or 'sample' (see ``quantiles``)
+                         Dask-backed DataArrays are clipped lazily with ``auto_clip_dask`` (always 'histogram')
+        - inplace: bool -> if False (default), the values are copied once and the DataArray is left unchanged
+                           if True, the values of the DataArray are clipped in place and the DataArray itself is returned
+        - dtype: -> convert the values to this dtype (e.g. np.float32), the conversion replaces the copy
 
     Returns:
     --------
         - xr.DataArray: Clipped DataArray.
     '''
-    # Extract the numpy array from the DataArray
-    I = dataarray.values
-    
-    # Apply the auto_clip function
-    clipped_array = auto_clip(I, percentile, pooled)
+    if dataarray.chunks is not None:
+        # Dask-backed: computed chunk by chunk, the quantiles are always computed from histograms
+        clipped_array = auto_clip_dask(dataarray.data, percentile, pooled, dtype)
+    else:
+        # Extract the numpy array from the DataArray (no copy)
+        I = dataarray.values
+        
+        # Apply the auto_clip function
+        clipped_array = auto_clip(I, percentile, pooled, method, inplace, dtype)
     
-    # Create a new DataArray with the clipped values, preserving the original coordinates and attributes
-    clipped_dataarray = xr.DataArray(clipped_array, dims=dataarray.dims, coords=dataarray.coords, attrs=dataarray.attrs)
+    return _wrap_result(dataarray, clipped_array, inplace)
+
+def _wrap_result(dataarray: xr.DataArray, values, inplace: bool) -> xr.DataArray:
+    '''
+    Return the processed values as DataArray: the input DataArray itself (inplace) or a new DataArray 
+    with the coordinates and attributes of the input DataArray.
+    '''
+    if inplace:
+        # Only replaces the data if it is a new array (dtype conversion or dask)
+        if values is not dataarray.data:
+            dataarray.data = values
+        return dataarray
     
-    return clipped_dataarray
+    # Create a new DataArray with the new values, preserving the original coordinates and attributes
+    return xr.DataArray(values, dims=dataarray.dims, coords=dataarray.coords, attrs=dataarray.attrs, name=dataarray.name)
 
-def auto_clip_dataset(ds, *args, **kwargs):
+def auto_clip_dataset(ds, *args, inplace=False, **kwargs):
     '''
     This function clips the values of a Dataset using the auto_clip_dataarray function.
 
@@ -220,19 +528,23 @@ def auto_clip_dataset(ds, *args, **kwargs):
     -------
         - ds: xr.Dataset -> Dataset to be clipped
         - *args: -> arguments to be passed to the auto_clip_dataarray function
-        - **kwargs: -> keyword arguments to be passed to the auto_clip_dataarray function
+        - inplace: bool -> if False (default), every data variable is copied once and ds is left unchanged
+                           if True, the data variables of ds are clipped in place and ds itself is returned
+        - **kwargs: -> keyword arguments to be passed to the auto_clip_dataarray function (e.g. dtype)
 
     Returns:   
     --------
         - xr.Dataset: Clipped Dataset.
     '''
-    ds = ds.copy()
+    if not inplace:
+        # Shallow copy: the new Dataset gets new variables, the values are only copied by auto_clip_dataarray
+        ds = ds.copy(deep=False)
     for var in ds.data_vars:
-        clipped = auto_clip_dataarray(ds[var].copy(), *args, **kwargs)
-        ds[var] = clipped
+        ds[var] = auto_clip_dataarray(ds[var], *args, inplace=inplace, **kwargs)
     return ds
 
-def stretch_dataarray(dataarray: xr.DataArray, p_min: float, p_max: float, pooled: bool = True) -> xr.DataArray:
+def stretch_dataarray(dataarray: xr.DataArray, p_min: float, p_max: float, pooled: bool = True,
+                      inplace: bool = False, dtype=None) -> xr.DataArray:
     '''
     This function stretches the values of a DataArray using the stretch function.
 
@@ -243,18 +555,225 @@ def stretch_dataarray(dataarray: xr.DataArray, p_min: float, p_max: float, poole
         - p_max: float -> upper boundary of the output range
         - pooled: bool -> if True, the transformation is computed for and applied to all bands simultaneously
                           if False, the transformation is computed for and applied to the individual bands separately
+                          Dask-backed DataArrays are stretched lazily with ``stretch_dask``
+        - inplace: bool -> if False (default), the values are copied once and the DataArray is left unchanged
+                           if True, the values of the DataArray are stretched in place and the DataArray itself is returned
+        - dtype: -> convert the values to this dtype (e.g. np.float32 for uint16 bands), the conversion replaces the copy
 
     Returns:
     --------
         - xr.DataArray: Stretched DataArray.
     '''
-    # Extract the numpy array from the DataArray
-    I = dataarray.values
-    
-    # Apply the stretch function
-    stretched_array = stretch(I, p_min, p_max, pooled)
-    
-    # Create a new DataArray with the stretched values, preserving the original coordinates and attributes
-    stretched_dataarray = xr.DataArray(stretched_array, dims=dataarray.dims, coords=dataarray.coords, attrs=dataarray.attrs)
+    if dataarray.chunks is not None:
+        # Dask-backed: stays lazy, only the minimum and maximum are computed
+        stretched_array = stretch_dask(dataarray.data, p_min, p_max, pooled, dtype)
+    else:
+        # Extract the numpy array from the DataArray (no copy)
+        I = dataarray.values
+        
+        # Apply the stretch function
+        stretched_array = stretch(I, p_min, p_max, pooled, inplace, dtype)
     
-    return stretched_dataarray
+    return _wrap_result(dataarray, stretched_array, inplace)
+
+def auto_clip_stretch_dataarray(dataarray: xr.DataArray, percentile: float = 0.02, p_min: float = 0, p_max: float = 1,
+                                pooled: bool = True, dtype=np.float32, method: str = 'exact', 
+                                inplace: bool = False) -> xr.DataArray:
+    '''
+    This function clips and stretches the values of a DataArray in one pass using the auto_clip_stretch function.
+
+    Params:
+    -------
+        - dataarray: xr.DataArray -> DataArray to be clipped and stretched
+        - percentile: float -> percentile defining the clipping boundaries of I in terms of its distribution (defaults to 0.02)
+        - p_min: float -> lower boundary of the output range
+        - p_max: float -> upper boundary of the output range
+        - pooled: bool -> if True, computes the pooled percentile and transformation over all bands
+                          if False, computes them for each band individually
+        - dtype: -> dtype used for non floating point DataArrays (defaults to float32)
+        - method: str -> how the quantiles are computed: 'exact' (default), 'histogram' or 'sample' (see ``quantiles``)
+                         Dask-backed DataArrays are processed lazily with ``auto_clip_stretch_dask`` (always 'histogram')
+        - inplace: bool -> if False (default), the values are copied (or converted to dtype) once and the DataArray is left unchanged
+                           if True, floating point values are processed in place and the DataArray itself is returned
+
+    Returns:
+    --------
+        - xr.DataArray: Clipped and stretched DataArray.
+    '''
+    if dataarray.chunks is not None:
+        # Dask-backed: computed chunk by chunk, the quantiles are always computed from histograms
+        result = auto_clip_stretch_dask(dataarray.data, percentile, p_min, p_max, pooled, dtype=dtype)
+    else:
+        # Extract the numpy array from the DataArray (no copy)
+        I = dataarray.values
+
+        # Apply the auto_clip_stretch function
+        result = auto_clip_stretch(I, percentile, p_min, p_max, pooled, dtype=dtype, method=method, inplace=inplace)
+
+    return _wrap_result(dataarray, result, inplace)
+
+# Dask-backed DataArrays (e.g. from ``load_multiple_timestamps_regex(..., lazy=True)``) are processed chunk by chunk:
+# the boundaries are computed with reductions over the chunks and only scalars/one value per band are brought 
+# into memory, the clipping and stretching are applied lazily with ``map_blocks``.
+# As for the numpy functions, the last axis is the band axis.
+
+def _dask_bands(I, pooled:bool) -> list:
+    '''
+    List of the arrays the boundaries are computed for: the whole array (pooled) or one array per band.
+    '''
+    return [I] if pooled else [I[..., band] for band in range(I.shape[-1])]
+
+def _dask_min_max(I, pooled:bool) -> tuple:
+    '''
+    Minimum and maximum of a dask array (pooled or per band) with a single reduction over all chunks.
+    '''
+    import dask
+    import dask.array as da
+
+    bands = _dask_bands(I, pooled)
+    mins, maxs = dask.compute([da.nanmin(b) for b in bands], [da.nanmax(b) for b in bands])
+    if pooled:
+        return mins[0], maxs[0]
+    return np.array(mins), np.array(maxs)
+
+def _dask_clip_bounds(I, percentile:float, pooled:bool) -> tuple:
+    '''
+    Clipping boundaries of a dask array computed from histograms which are counted chunk by chunk.
+    Integer images are counted per value (exact), floating point images in ``HISTOGRAM_BINS`` bins
+    (same error bounds as the 'histogram' method of ``quantiles``).
+    Needs two passes over the chunks: one for min/max (bin range) and one for the counts.
+    '''
+    import dask
+    import dask.array as da
+
+    q = [percentile, 1 - percentile]
+    bands = _dask_bands(I, pooled)
+    v_mins, v_maxs = _dask_min_max(I, pooled)
+    v_mins, v_maxs = np.atleast_1d(v_mins), np.atleast_1d(v_maxs)
+
+    # Bin layout per band: (first value, bin width, discrete)
+    layouts, counts = [], []
+    for band, v_min, v_max in zip(bands, v_mins, v_maxs):
+        if np.issubdtype(I.dtype, np.integer) and v_max - v_min < _MAX_INTEGER_BINS:
+            nbins = int(v_max - v_min) + 1
+            layouts.append((v_min, 1, True))
+            counts.append(da.histogram(band, bins=nbins, range=(v_min - 0.5, v_max + 0.5))[0])
+        else:
+            width = (v_max - v_min) / HISTOGRAM_BINS
+            layouts.append((v_min, width, False))
+            # NaNs are outside of the range and therefore not counted
+            counts.append(da.histogram(band, bins=HISTOGRAM_BINS, range=(v_min, v_max))[0])
+    counts = dask.compute(*counts)
+
+    bounds = []
+    for (start, width, discrete), count in zip(layouts, counts):
+        if width == 0:
+            bounds.append(np.full(len(q), start, dtype=np.float64))
+        else:
+            bounds.append(_counts_quantiles(count, q, start, width, discrete))
+    v_min, v_max = np.stack(bounds, axis=-1)
+    if pooled:
+        return v_min[0], v_max[0]
+    return v_min, v_max
+
+def _per_band_chunks(I, pooled:bool):
+    '''
+    Per band boundaries are broadcast along the last axis, so the band axis must not be split into several chunks.
+    '''
+    return I if pooled else I.rechunk({I.ndim - 1: -1})
+
+def _clip_block(block:ndarray, v_min, v_max, dtype) -> ndarray:
+    '''
+    Clip a single chunk (without modifying it, chunks may be shared in the dask graph).
+    '''
+    return clip(block, v_min, v_max, inplace=False, dtype=dtype)
+
+def _stretch_block(block:ndarray, scale, offset, lower:float, upper:float, dtype) -> ndarray:
+    '''
+    Apply the affine transformation ``block * scale + offset`` to a single chunk and clip the result to [lower, upper].
+    '''
+    out = block.astype(dtype)
+    out *= scale
+    out += offset
+    np.clip(out, lower, upper, out=out)
+    return out
+
+def _affine(v_min, v_max, p_min:float, p_max:float) -> tuple:
+    '''
+    Scale and offset of the affine transformation of [v_min, v_max] to [p_min, p_max].
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = (p_max - p_min) / (np.asarray(v_max, dtype=np.float64) - v_min)
+    return scale, p_min - v_min * scale
+
+def auto_clip_dask(I, percentile:float=0.02, pooled:bool=True, dtype=None):
+    '''
+    Lazy version of ``auto_clip`` for dask arrays.
+
+    Params:
+    -------
+        - I: dask.array.Array -> image array, the last axis is the band axis
+        - percentile: float -> percentile defining the clipping boundaries (defaults to 0.02)
+        - pooled: bool -> if True, computes the pooled percentile over all bands, if False for each band individually
+        - dtype: -> dtype of the result (defaults to the dtype of I)
+
+    Returns:
+    --------
+        - dask.array.Array: Clipped image data (not computed yet).
+    '''
+    v_min, v_max = _dask_clip_bounds(I, percentile, pooled)
+    I = _per_band_chunks(I, pooled)
+    dtype = I.dtype if dtype is None else np.dtype(dtype)
+    return I.map_blocks(_clip_block, v_min, v_max, dtype, dtype=dtype)
+
+def stretch_dask(I, p_min:float, p_max:float, pooled:bool=True, dtype=None):
+    '''
+    Lazy version of ``stretch`` for dask arrays.
+    As in ``stretch``, the result keeps the dtype of I unless dtype is given.
+
+    Params:
+    -------
+        - I: dask.array.Array -> image array, the last axis is the band axis
+        - p_min: float -> lower boundary of the output range
+        - p_max: float -> upper boundary of the output range
+        - pooled: bool -> if True, the transformation is computed over all bands, if False for each band individually
+        - dtype: -> dtype of the result (e.g. np.float32 for uint16 images)
+
+    Returns:
+    --------
+        - dask.array.Array: Normalised image data (not computed yet).
+    '''
+    q_min, q_max = _dask_min_max(I, pooled)
+    scale, offset = _affine(q_min, q_max, p_min, p_max)
+    lower, upper = min(p_min, p_max), max(p_min, p_max)
+    I = _per_band_chunks(I, pooled)
+    dtype = I.dtype if dtype is None else np.dtype(dtype)
+    if np.issubdtype(dtype, np.floating):
+        return I.map_blocks(_stretch_block, scale, offset, lower, upper, dtype, dtype=dtype)
+    out = I.map_blocks(_stretch_block, scale, offset, lower, upper, np.float64, dtype=np.float64)
+    return out.astype(dtype)
+
+def auto_clip_stretch_dask(I, percentile:float=0.02, p_min:float=0, p_max:float=1, pooled:bool=True, dtype=np.float32):
+    '''
+    Lazy version of ``auto_clip_stretch`` for dask arrays.
+
+    Params:
+    -------
+        - I: dask.array.Array -> image array, the last axis is the band axis
+        - percentile: float -> percentile defining the clipping boundaries (defaults to 0.02)
+        - p_min: float -> lower boundary of the output range
+        - p_max: float -> upper boundary of the output range
+        - pooled: bool -> if True, quantiles and transformation are computed over all bands, if False for each band individually
+        - dtype: -> dtype used for non floating point images (defaults to float32)
+
+    Returns:
+    --------
+        - dask.array.Array: Clipped and normalised image data (not computed yet).
+    '''
+    v_min, v_max = _dask_clip_bounds(I, percentile, pooled)
+    scale, offset = _affine(v_min, v_max, p_min, p_max)
+    lower, upper = min(p_min, p_max), max(p_min, p_max)
+    if np.issubdtype(I.dtype, np.floating):
+        dtype = I.dtype
+    I = _per_band_chunks(I, pooled)
+    return I.map_blocks(_stretch_block, scale, offset, lower, upper, dtype, dtype=dtype)
@@ -0,0 +1,245 @@
+#Description
+'''
+This script is intended to simplify further processes in your code.
+In here you will find all the necessary functions to download many products concurrently:
+partial archives are resumed, archives are checked before they are extracted and products
+which are already complete in the download directory are skipped.
+'''
+
+
+
+from __future__ import annotations
+
+#Variables:
+__name__ = 'download'
+__version__ = '20-Jun-2024_v01'
+
+
+
+#Modules:
+import os
+import time
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+from .lazy import lazy_import
+from .loading import load_assets
+
+# Heavy dependencies are imported at their first use
+requests = lazy_import('requests')
+
+if TYPE_CHECKING:
+    from eodag import EOProduct, SearchResult
+
+
+# Size of the pieces in which an archive is streamed to disk. A dropped connection loses the piece
+# which is being received, so small pieces keep most of the data for resuming.
+CHUNK_SIZE = 64 * 1024
+
+
+class IncompleteProductError(RuntimeError):
+    '''
+    Raised if an extracted product does not contain the expected bands.
+    '''
+
+
+def product_dir(product:EOProduct, download_dir:str|Path) -> Path:
+    '''
+    Directory of a product in the download directory (named after the product title, as by ``dag.download``).
+    '''
+    return Path(download_dir) / product.properties['title']
+
+def is_complete(root:str|Path, bands:list[str]=None, res:int=10) -> bool:
+    '''
+    Checks if a downloaded product contains the expected band files (see ``load_assets``).
+
+    Params:
+    -------
+        - root: str|Path -> root directory of a downloaded product in SAFE format
+        - bands: list[str] -> expected bands (e.g.: ['B02', 'B03', 'B04', 'B08']), if None at least one band is expected
+        - res: int -> resolution of the expected bands (10, 20, 60)
+
+    Returns:
+    -------
+        - complete: bool
+    '''
+    if not os.path.isdir(root):
+        return False
+    assets = load_assets(root, res=res)
+    if bands is None:
+        return len(assets) > 0
+    return set(bands).issubset(assets)
+
+def fetch_archive(url:str, target:str|Path, auth=None, chunk_size:int=CHUNK_SIZE, timeout:float=60) -> Path:
+    '''
+    Downloads an archive to ``target``. The data is first written to ``<target>.part``, if this file exists
+    (from an interrupted download) the download is resumed with an HTTP Range request.
+    Servers which ignore the Range header send the whole file, which is then written from the start.
+
+    Params:
+    -------
+        - url: str -> download link of the archive
+        - target: str|Path -> filepath of the archive
+        - auth: -> requests authentication (e.g. from ``product.downloader_auth.authenticate()``)
+        - chunk_size: int -> number of bytes written at once
+        - timeout: float -> timeout in seconds for connecting and for every read
+
+    Returns:
+    -------
+        - target: Path -> filepath of the downloaded archive
+    '''
+    target = Path(target)
+    part = target.with_name(target.name + '.part')
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+    with requests.get(url, headers=headers, auth=auth, stream=True, timeout=timeout) as response:
+        if response.status_code == 416:
+            # Range not satisfiable: the part file already holds the whole archive
+            pass
+        else:
+            response.raise_for_status()
+            resumed = response.status_code == 206
+            length = response.headers.get('Content-Length')
+            expected = (offset if resumed else 0) + int(length) if length is not None else None
+            with open(part, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+
+            # A dropped connection can end the stream early without an error, the part file is kept for resuming
+            if expected is not None and part.stat().st_size < expected:
+                raise OSError(f'Incomplete download of {url}: {part.stat().st_size} of {expected} bytes.')
+
+    os.replace(part, target)
+    return target
+
+def extract_archive(archive:str|Path, root:str|Path) -> Path:
+    '''
+    Checks a zip archive (CRC of all members) and extracts it into ``root``.
+    The archive is extracted into a temporary directory first, so ``root`` never contains a partial product.
+
+    Params:
+    -------
+        - archive: str|Path -> filepath of the zip archive
+        - root: str|Path -> directory of the product
+
+    Returns:
+    -------
+        - root: Path
+    '''
+    root = Path(root)
+    tmp = root.with_name(f'.{root.name}.extracting')
+    with zipfile.ZipFile(archive) as zf:
+        broken = zf.testzip()
+        if broken is not None:
+            raise zipfile.BadZipFile(f'{archive}: corrupted member {broken}')
+        shutil.rmtree(tmp, ignore_errors=True)
+        zf.extractall(tmp)
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+    return root
+
+def download_product(product:EOProduct, download_dir:str|Path, bands:list[str]=None, res:int=10, auth=None,
+                     retries:int=2, backoff:float=1.0, keep_archive:bool=False, timeout:float=60) -> Path:
+    '''
+    Downloads, checks and extracts a single product. Nothing is downloaded if the product is already complete.
+    Interrupted downloads are resumed, corrupted archives and products without the expected bands
+    are removed and downloaded again from the start (``IncompleteProductError`` after the last retry).
+
+    Params:
+    -------
+        - product: EOProduct -> product to download
+        - download_dir: str|Path -> download directory (``workspace['download']``)
+        - bands: list[str] -> bands which have to be present after the download (see ``is_complete``)
+        - res: int -> resolution of the expected bands (10, 20, 60)
+        - auth: -> requests authentication, defaults to the authentication of the product's provider
+        - retries: int -> number of retries after a failed download
+        - backoff: float -> seconds to wait before the first retry, doubled for every further retry
+        - keep_archive: bool -> if True, the zip archive is kept next to the extracted product
+        - timeout: float -> timeout in seconds for connecting and for every read
+
+    Returns:
+    -------
+        - root: Path -> directory of the downloaded product
+    '''
+    root = product_dir(product, download_dir)
+    if not is_complete(root, bands, res):
+        if auth is None and getattr(product, 'downloader_auth', None) is not None:
+            auth = product.downloader_auth.authenticate()
+        url = product.properties.get('downloadLink') or product.remote_location
+        archive = Path(download_dir) / f"{product.properties['title']}.zip"
+
+        for attempt in range(retries + 1):
+            try:
+                fetch_archive(url, archive, auth=auth, timeout=timeout)
+                extract_archive(archive, root)
+                if not is_complete(root, bands, res):
+                    raise IncompleteProductError('Expected bands are missing after the download.')
+                break
+            except (zipfile.BadZipFile, IncompleteProductError):
+                # A corrupted (or wrongly resumed) archive or an incomplete product cannot be repaired,
+                # remove both and start again from the beginning, so no partial product is left on disk
+                archive.unlink(missing_ok=True)
+                shutil.rmtree(root, ignore_errors=True)
+                if attempt == retries:
+                    raise
+            except (requests.RequestException, OSError):
+                if attempt == retries:
+                    raise
+            time.sleep(backoff * 2**attempt)
+
+        if not keep_archive:
+            archive.unlink(missing_ok=True)
+
+    # Later calls (e.g. ``load_multiple_timestamps_regex``) read the local files
+    product.location = root.as_uri()
+    return root
+
+def download_products(products:SearchResult|list[EOProduct], download_dir:str|Path, workers:int=4, bands:list[str]=None,
+                      res:int=10, retries:int=2, backoff:float=1.0, keep_archive:bool=False, timeout:float=60,
+                      log:bool=True) -> list[Path|None]:
+    '''
+    Downloads several products concurrently (replaces ``dag.download_all``).
+    Products which are already complete in the download directory are skipped, interrupted downloads are resumed.
+    A failed product does not stop the other downloads.
+
+    Params:
+    -------
+        - products: SearchResult|list[EOProduct] -> products to download
+        - download_dir: str|Path -> download directory (``workspace['download']``)
+        - workers: int -> number of products downloaded at the same time
+        - bands: list[str] -> bands which have to be present after the download (see ``is_complete``)
+        - res: int -> resolution of the expected bands (10, 20, 60)
+        - retries: int -> number of retries after a failed download
+        - backoff: float -> seconds to wait before the first retry, doubled for every further retry
+        - keep_archive: bool -> if True, the zip archives are kept next to the extracted products
+        - timeout: float -> timeout in seconds for connecting and for every read
+        - log: bool -> if True, print a summary and the failed products
+
+    Returns:
+    -------
+        - roots: list[Path|None] -> directories of the products (same order as products), None if the download failed
+    '''
+    download_dir = Path(download_dir)
+    download_dir.mkdir(parents=True, exist_ok=True)
+    skipped = sum(is_complete(product_dir(product, download_dir), bands, res) for product in products)
+
+    roots, errors = [], {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(download_product, product, download_dir, bands=bands, res=res, retries=retries,
+                               backoff=backoff, keep_archive=keep_archive, timeout=timeout)
+                   for product in products]
+        for product, future in zip(products, futures):
+            try:
+                roots.append(future.result())
+            except Exception as e:
+                roots.append(None)
+                errors[product.properties['title']] = e
+
+    if log:
+        print(f'{len(products) - skipped - len(errors)} products downloaded, {skipped} already complete, {len(errors)} failed.')
+        for title, e in errors.items():
+            print(f'    {title}: {e}')
+    return roots
@@ -7,6 +7,8 @@ into Polygons and to preprocess the data for classification.
 
 
 
+from __future__ import annotations
+
 #Variables:
 __name__ = 'geometry'
 __version__ = '20-Jun-2024_v01'
@@ -14,15 +16,71 @@ __version__ = '20-Jun-2024_v01'
 
 
 #Modules:
-import rioxarray
-import xarray as xr
+import os
+import math
+import json
+import hashlib
 import numpy as np
-import geopandas as gpd
-from shapely.geometry import mapping, box
-from sklearn.model_selection import train_test_split
+from shapely.geometry import mapping, box, shape
+from shapely.ops import unary_union
+from .lazy import lazy_import
+from .spatial import dataset_bounds, within_bounds
+
+# Heavy dependencies are imported at their first use (``rioxarray`` inside of the functions which use ``.rio``)
+xr = lazy_import('xarray')
+gpd = lazy_import('geopandas')
+rio_features = lazy_import('rasterio.features')
+rio_windows = lazy_import('rasterio.windows')
+rio_errors = lazy_import('rasterio.errors')
+model_selection = lazy_import('sklearn.model_selection')
+
+
+# In-process cache of read geometry files: absolute path -> (mtime, size, GeoDataFrame)
+_geometry_cache = {}
+
+def read_geometries(path:str, parquet_dir:str=None) -> gpd.GeoDataFrame:
+    '''
+    Reads a geometry file (Geojson, Shapefile, ...) with an in-process cache.
+    The file is only parsed again if its modification time or size has changed.
+    If ``parquet_dir`` is given (e.g. ``workspace['shapefiles']``), the file is converted to GeoParquet once
+    and later reads (also in new sessions) load the GeoParquet file instead of parsing the Geojson again.
 
+    Params:
+    -------
+        - ``path``: Filepath to the geometry file
+        - ``parquet_dir`` (optional): Directory for the converted GeoParquet files (needs pyarrow)
 
-def clip_dataset_2_shapefile(ds:xr.Dataset, shapefile:str) -> xr.Dataset:
+    Returns:
+    -------
+        - ``gdf``: geopandas.GeoDataFrame (a copy, the cached GeoDataFrame is not modified by the caller)
+    '''
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    cached = _geometry_cache.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2].copy()
+
+    if parquet_dir is not None and not path.endswith('.parquet'):
+        # The name contains a hash of the source path, so files with the same name in different directories do not collide
+        name = f"{os.path.splitext(os.path.basename(path))[0]}-{hashlib.sha1(path.encode()).hexdigest()[:10]}.parquet"
+        parquet = os.path.join(parquet_dir, name)
+        if os.path.exists(parquet) and os.stat(parquet).st_mtime_ns >= stat.st_mtime_ns:
+            gdf = gpd.read_parquet(parquet)
+        else:
+            gdf = gpd.read_file(path)
+            os.makedirs(parquet_dir, exist_ok=True)
+            tmp = f'{parquet}.{os.getpid()}.tmp'
+            gdf.to_parquet(tmp)
+            os.replace(tmp, parquet)
+    elif path.endswith('.parquet'):
+        gdf = gpd.read_parquet(path)
+    else:
+        gdf = gpd.read_file(path)
+
+    _geometry_cache[path] = (stat.st_mtime_ns, stat.st_size, gdf)
+    return gdf.copy()
+
+def clip_dataset_2_shapefile(ds:xr.Dataset, shapefile:str, parquet_dir:str=None) -> xr.Dataset:
     '''
     Clips an xarray Dataset to a shapefile.
 
@@ -30,32 +88,35 @@ def clip_dataset_2_shapefile(ds:xr.Dataset, shapefile:str) -> xr.Dataset:
     ------
         - ``ds``: xarray.Dataset
         - ``shapefile``: Filepath to Shapefile
+        - ``parquet_dir`` (optional): Directory for GeoParquet conversions (see ``read_geometries``)
 
     Returns:
     -------
         - ``ds``: Clipped xarray.Dataset
     '''
-    clip_shape = gpd.read_file(shapefile)
+    import rioxarray
+    clip_shape = read_geometries(shapefile, parquet_dir)
     ds = ds.rio.clip(clip_shape.geometry.apply(mapping), clip_shape.crs, drop=False, invert=False)
     return ds
 
-def geojson_to_polygon(path:str) -> list:
+def geojson_to_polygon(path:str, parquet_dir:str=None) -> list:
     '''
     Reads a geojson File and returns a List of Polygons 
 
     Params:
     -------
         - ``path``: Filepath to Geojson
+        - ``parquet_dir`` (optional): Directory for GeoParquet conversions (see ``read_geometries``)
 
     Returns: 
     -------
         - ``polygons``: List of Polygons
     '''
-    gdf = gpd.read_file(path)
+    gdf = read_geometries(path, parquet_dir)
     polygons = [feature for feature in gdf.geometry]
     return polygons
 
-def geojson_to_polygon_dict(path:str, ds:xr.Dataset=None) -> dict:
+def geojson_to_polygon_dict(path:str, ds:xr.Dataset=None, parquet_dir:str=None) -> dict:
     '''
     Uses the Path of a Geojson File to extract the polygons and puts them into a Dictionary.
 
@@ -63,16 +124,20 @@ def geojson_to_polygon_dict(path:str, ds:xr.Dataset=None) -> dict:
     ------- 
         - ``path``: Filepath to Geojson
         - ``ds``: xarray.Dataset (optional)
+        - ``parquet_dir`` (optional): Directory for GeoParquet conversions (see ``read_geometries``)
     Returns: 
     -------
         - ``polygons_dict``
     '''
     if ds is not None:
-        polygons = [poly for poly in geojson_to_polygon(path) if check_in_bounds(dataset=ds, polygon=poly)]
+        # Bounds of the Dataset are computed once and all polygons are checked with a single vectorized call
+        polygons = geojson_to_polygon(path, parquet_dir)
+        inside = within_bounds(polygons, dataset_bounds(ds))
+        polygons = [poly for poly, keep in zip(polygons, inside) if keep]
         if len(polygons) == 0:
             raise ValueError('No polygons in the GeoJSON file are within the bounds of the xarray Dataset.')
     else:
-        polygons = geojson_to_polygon(path)
+        polygons = geojson_to_polygon(path, parquet_dir)
         
     polygons_dict = {idx: [polygon] for idx, polygon in enumerate(polygons)}
     return polygons_dict
@@ -88,37 +153,109 @@ def check_in_bounds(dataset, polygon):
     Returns:
     bool: True, wenn das Polygon innerhalb des geographischen Bereichs des Datasets liegt, andernfalls False.
     """
-    # Extrahiere die geographischen Grenzen des xarray Datasets
-    lat_min = dataset.coords['y'].min().item()
-    lat_max = dataset.coords['y'].max().item()
-    lon_min = dataset.coords['x'].min().item()
-    lon_max = dataset.coords['x'].max().item()
-
     # Erstelle ein Rechteck, das den geographischen Bereich des xarray Datasets repräsentiert
-    bounding_box = box(lon_min, lat_min, lon_max, lat_max)
+    # (für viele Polygone ``within_bounds`` mit einmalig berechneten ``dataset_bounds`` verwenden)
+    bounding_box = box(*dataset_bounds(dataset))
 
     # Überprüfe, ob das Polygon innerhalb des geographischen Bereichs liegt
     return bounding_box.contains(polygon)
 
-def clip_array(ds:xr.Dataset, polygons):
+def clip_array(ds:xr.Dataset, polygons, all_touched:bool=False):
     '''
     Takes an xarray.Dataset and a geometry and returns the xarray.Dataset, which has been spatialy clipped
     to the geometry.
+    Only the pixel window of the geometry is sliced out of the Dataset (no copy of the Dataset) and the
+    rasterized geometry is applied as mask inside of this window.
 
     Params:
     -------
         - ``ds``: xarray.Dataset
-        - ``polygons``: shapely.geometry
+        - ``polygons``: shapely.geometry or List of shapely.geometry (in the CRS of the Dataset)
+        - ``all_touched`` (optional): If True, all pixels touched by the polygons are kept
     
     Returns:
     -------
         - ``clipped_nan``: clipped dataset where values outside of polygons have Nan type
     '''
-    clipped = ds.rio.clip(polygons, invert=False, all_touched=False, drop=True)
-    clipped_nan = clipped.where(clipped == ds)
+    if not isinstance(polygons, (list, tuple)):
+        polygons = [polygons]
+    polygons = [shape(poly) if isinstance(poly, dict) else poly for poly in polygons]
+
+    import rioxarray
+
+    # Pixel window of the polygons (rounded outwards) within the Dataset
+    transform = ds.rio.transform()
+    xmin, ymin, xmax, ymax = unary_union(polygons).bounds
+    window = rio_windows.from_bounds(xmin, ymin, xmax, ymax, transform=transform)
+    row_start, col_start = math.floor(window.row_off), math.floor(window.col_off)
+    row_stop, col_stop = math.ceil(window.row_off + window.height), math.ceil(window.col_off + window.width)
+    window = rio_windows.Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+    try:
+        window = window.intersection(rio_windows.Window(0, 0, ds.sizes['x'], ds.sizes['y']))
+    except rio_errors.WindowError:
+        raise ValueError('No data found in bounds of the polygons.')
+
+    # Mask inside of the window, cropped to the pixels which are part of the polygons
+    mask = rio_features.geometry_mask(polygons, out_shape=(window.height, window.width),
+                                      transform=rio_windows.transform(window, transform), all_touched=all_touched, invert=True)
+    rows, cols = np.nonzero(mask.any(axis=1))[0], np.nonzero(mask.any(axis=0))[0]
+    if len(rows) == 0:
+        raise ValueError('No data found in bounds of the polygons.')
+    mask = mask[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    window_ds = ds.isel(y=slice(window.row_off + rows[0], window.row_off + rows[-1] + 1),
+                        x=slice(window.col_off + cols[0], window.col_off + cols[-1] + 1))
+    clipped_nan = window_ds.where(xr.DataArray(mask, dims=('y', 'x')))
     return clipped_nan
 
-def preprocess_data_to_classify(ds:xr.Dataset, feature_path:str, nonfeature_path:str, bands:list=None) -> list:
+def rasterize_polygons(ds:xr.Dataset, polygons:list, all_touched:bool=False) -> np.ndarray:
+    '''
+    Burns polygons into a boolean mask on the grid of an xarray Dataset. 
+    As in ``clip_array``, a pixel belongs to a polygon if its center is inside of it (unless all_touched=True)
+    and the polygons have to be in the CRS of the Dataset.
+
+    Params:
+    -------
+        - ``ds``: xarray.Dataset
+        - ``polygons``: List of shapely.geometry
+        - ``all_touched`` (optional): If True, all pixels touched by the polygons are part of the mask
+
+    Returns:
+    -------
+        - ``mask``: np.ndarray of shape (y, x), True for pixels inside of any polygon
+    '''
+    import rioxarray
+    shape = (ds.sizes['y'], ds.sizes['x'])
+    if len(polygons) == 0:
+        return np.zeros(shape, dtype=bool)
+    return rio_features.geometry_mask(polygons, out_shape=shape, transform=ds.rio.transform(), all_touched=all_touched,
+                                      invert=True)
+
+def extract_pixels(ds:xr.Dataset, mask:np.ndarray, bands:list) -> np.ndarray:
+    '''
+    Gathers the pixels of a mask from an xarray Dataset and computes their median over time.
+    Only the masked pixels are read, so dask-backed Datasets are not loaded completely.
+
+    Params:
+    -------
+        - ``ds``: xarray.Dataset with the dimensions time, y and x
+        - ``mask``: np.ndarray of shape (y, x), e.g. from ``rasterize_polygons``
+        - ``bands``: List of Strings of the Bands to extract
+
+    Returns:
+    -------
+        - ``values``: np.ndarray of shape (pixels, bands), NaN where a band has no valid value at any time.
+                      Float bands keep their dtype, integer bands become float32.
+    '''
+    rows, cols = np.nonzero(mask)
+    pixels = ds[bands].isel(y=xr.DataArray(rows, dims='pixel'), x=xr.DataArray(cols, dims='pixel'))
+    if 'time' in pixels.dims:
+        pixels = pixels.median(dim='time', skipna=True)
+    dtype = np.result_type(np.float32, *[ds[band].dtype for band in bands])
+    return pixels.to_array(dim='band').transpose('pixel', 'band').values.astype(dtype, copy=False)
+
+def preprocess_data_to_classify(ds:xr.Dataset, feature_path:str, nonfeature_path:str, bands:list=None,
+                                parquet_dir:str=None) -> list:
     '''
     Takes an xarray Dataset, two geojson files (one of areas with the desired feature, the other not with the feature)
     and a list of strings of the desired Bandnames in the Dataset and returns The Training and Test data for some Classifikators.
@@ -130,6 +267,7 @@ def preprocess_data_to_classify(ds:xr.Dataset, feature_path:str, nonfeature_path
         - ``nonfeature_path``: Filepath to Geojson, which does not have the feature (e.g.: not forested Areas)
         - ``bands`` (optional): List of Strings of desired Spectral Bands (e.g.: bands=['B02', 'B03', 'B04', 'B08'])
                                 If None, then takes all in the Dataset.
+        - ``parquet_dir`` (optional): Directory for GeoParquet conversions of the Geojson files (see ``read_geometries``)
 
     Returns:
     -------
@@ -139,39 +277,204 @@ def preprocess_data_to_classify(ds:xr.Dataset, feature_path:str, nonfeature_path
     if bands == None:
         bands = list(ds.data_vars)
 
-    # Geojsons from Features to Polygons
-    polygons_feat:dict = geojson_to_polygon_dict(feature_path, ds=ds)
-    polygons_nonfeat:dict = geojson_to_polygon_dict(nonfeature_path, ds=ds)
+    # Labeled pixels are extracted block by block and concatenated once
+    masks = training_masks(ds, feature_path, nonfeature_path, parquet_dir)
+    blocks = list(iter_training_blocks(ds, masks, bands))
+    X = np.concatenate([X_block for X_block, _ in blocks])
+    y = np.concatenate([y_block for _, y_block in blocks])
+    del blocks
 
-    # Dictionaries with Dataarrays, each clipped by a Polygon
-    data_dict_feat = {idx: clip_array(ds, polygon) for idx, polygon in polygons_feat.items()}
-    data_dict_nonfeat = {idx: clip_array(ds, polygon)  for idx, polygon in polygons_nonfeat.items()}
+    # Split into Training and Testing Data.
+    X_train, X_test, y_train, y_test = model_selection.train_test_split(X, y, test_size=0.5, random_state=42)
 
-    # Median over time to get rid of outliers
-    median_data_dict_feat = {idx: xarray.median(dim='time', skipna=True) for idx, xarray in data_dict_feat.items()}
-    median_data_dict_nonfeat = {idx: xarray.median(dim='time', skipna=True) for idx, xarray in data_dict_nonfeat.items()}
+    return X_train, X_test, y_train, y_test
 
-    # Reshape the polygon dataarrays to get a tuple (one value per band) of pixel values
-    feat_data = [xarray.to_array().values.reshape(len(bands),-1).T for xarray in median_data_dict_feat.values()]
-    nonfeat_data = [xarray.to_array().values.reshape(len(bands),-1).T for xarray in median_data_dict_nonfeat.values()]
+def training_masks(ds:xr.Dataset, feature_path:str, nonfeature_path:str, parquet_dir:str=None) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Rasterizes the polygons of both Geojson files on the grid of the Dataset.
 
-    # The rows of the different polygons are concatenated to a single array for further processing
-    feat_values = np.concatenate(feat_data)
-    nonfeat_values = np.concatenate(nonfeat_data)
+    Params:
+    -------
+        - ``ds``: xarray.Dataset
+        - ``feature_path``: Filepath to Geojson with Polygons, which represent the Feature (e.g.: forested Areas)
+        - ``nonfeature_path``: Filepath to Geojson, which does not have the feature (e.g.: not forested Areas)
+        - ``parquet_dir`` (optional): Directory for GeoParquet conversions of the Geojson files (see ``read_geometries``)
 
-    # Drop Nan Values
-    X_feat_data = feat_values[~np.isnan(feat_values).any(axis=1)]
-    X_nonfeat_data = nonfeat_values[~np.isnan(nonfeat_values).any(axis=1)]
+    Returns:
+    -------
+        - ``mask_feat, mask_nonfeat``: Boolean masks of shape (y, x)
+    '''
+    polygons_feat:dict = geojson_to_polygon_dict(feature_path, ds=ds, parquet_dir=parquet_dir)
+    polygons_nonfeat:dict = geojson_to_polygon_dict(nonfeature_path, ds=ds, parquet_dir=parquet_dir)
+    mask_feat = rasterize_polygons(ds, [poly for polys in polygons_feat.values() for poly in polys])
+    mask_nonfeat = rasterize_polygons(ds, [poly for polys in polygons_nonfeat.values() for poly in polys])
+    return mask_feat, mask_nonfeat
 
-    # Creating Output Vector (1 for pixel is features; 0 for pixel is not feature)
-    y_feat_data = np.ones(X_feat_data.shape[0])
-    y_nonfeat_data = np.zeros(X_nonfeat_data.shape[0])
-    
-    # Concatnate all Classes for training 
-    X = np.concatenate([X_feat_data, X_nonfeat_data])
-    y = np.concatenate([y_feat_data, y_nonfeat_data])
+def iter_training_blocks(ds:xr.Dataset, masks:tuple, bands:list=None, block_size:int=1024, dtype=None):
+    '''
+    Generator of training samples, one spatial block (block_size x block_size pixels) at a time.
+    Only the labeled pixels of the block are read (dask-backed Datasets are computed block by block),
+    their median over time is taken and pixels with NaN values are dropped.
 
-    # Split into Training and Testing Data.
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.5, random_state=42)
+    Params:
+    -------
+        - ``ds``: xarray.Dataset
+        - ``masks``: Boolean masks ``(mask_feat, mask_nonfeat)`` of shape (y, x), e.g. from ``training_masks``
+        - ``bands`` (optional): List of Strings of desired Spectral Bands. If None, then takes all in the Dataset.
+        - ``block_size`` (optional): Number of rows and columns of a block
+        - ``dtype`` (optional): dtype of X, if None the dtype of ``extract_pixels`` is kept (float32 for integer bands)
+
+    Yields:
+    -------
+        - ``X, y``: Samples of the block with shape (pixels, bands) and their labels with shape (pixels,)
+    '''
+    if bands == None:
+        bands = list(ds.data_vars)
+    # Feature pixels are labeled with 1, not feature pixels with 0
+    mask_feat, mask_nonfeat = masks
+    labeled = [(1, mask_feat), (0, mask_nonfeat)]
+
+    for row in range(0, ds.sizes['y'], block_size):
+        for col in range(0, ds.sizes['x'], block_size):
+            window = {'y': slice(row, row + block_size), 'x': slice(col, col + block_size)}
+            for label, mask in labeled:
+                block_mask = mask[window['y'], window['x']]
+                if not block_mask.any():
+                    continue
+                X = extract_pixels(ds.isel(window), block_mask, bands)
+                X = X[~np.isnan(X).any(axis=1)]
+                if dtype is not None:
+                    X = X.astype(dtype, copy=False)
+                if len(X) > 0:
+                    yield X, np.full(len(X), label, dtype=np.uint8)
+
+def write_training_store(path:str, blocks, n_rows:int, n_bands:int, dtype=np.float32) -> str:
+    '''
+    Writes training samples to a memory mapped training store, block by block.
+    The store is a directory with ``X.npy`` (rows, bands), ``y.npy`` (rows,) and ``meta.json`` (number of written rows).
+    The arrays are allocated with ``n_rows`` rows (an upper bound, e.g. the number of labeled pixels)
+    and truncated to the written rows after the last block.
+
+    Params:
+    -------
+        - ``path``: Directory of the training store
+        - ``blocks``: Iterable of (X, y), e.g. from ``iter_training_blocks``
+        - ``n_rows``: Upper bound of the number of samples
+        - ``n_bands``: Number of bands (columns of X)
+        - ``dtype`` (optional): dtype of X in the store (default: float32)
+
+    Returns:
+    -------
+        - ``path``: Directory of the training store
+    '''
+    os.makedirs(path, exist_ok=True)
+    X_store = np.lib.format.open_memmap(os.path.join(path, 'X.npy'), mode='w+', dtype=dtype, shape=(n_rows, n_bands))
+    y_store = np.lib.format.open_memmap(os.path.join(path, 'y.npy'), mode='w+', dtype=np.uint8, shape=(n_rows,))
+
+    count = 0
+    for X, y in blocks:
+        if count + len(X) > n_rows:
+            raise ValueError(f'More than n_rows={n_rows} samples were written to the training store.')
+        X_store[count:count + len(X)] = X
+        y_store[count:count + len(y)] = y
+        count += len(X)
+
+    X_store.flush()
+    y_store.flush()
+    del X_store, y_store
+    _truncate_npy(os.path.join(path, 'X.npy'), count)
+    _truncate_npy(os.path.join(path, 'y.npy'), count)
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'count': count, 'n_bands': n_bands}, f)
+    return path
+
+def _truncate_npy(path:str, n_rows:int) -> None:
+    '''
+    Shrinks a ``.npy`` file to its first ``n_rows`` rows in place: the shape in the header is rewritten
+    (padded to the same header length, so the data does not move) and the file is truncated.
+    '''
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+        shape = (n_rows,) + shape[1:]
+
+        # Magic string, version and length of the header (2 bytes in version 1.0, 4 bytes otherwise)
+        prefix = 10 if version == (1, 0) else 12
+        header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': fortran_order, 'shape': shape})
+        f.seek(prefix)
+        f.write(header.ljust(offset - prefix - 1).encode('latin1') + b'\n')
+        f.truncate(offset + int(np.prod(shape)) * dtype.itemsize)
+
+def build_training_store(ds:xr.Dataset, feature_path:str, nonfeature_path:str, path:str, bands:list=None,
+                         block_size:int=1024, dtype=np.float32, parquet_dir:str=None) -> str:
+    '''
+    Out-of-core version of ``preprocess_data_to_classify``: the labeled pixels are extracted block by block and 
+    written to a memory mapped training store instead of being collected in memory.
+
+    Params:
+    -------
+        - ``ds``: xarray.Dataset (may be dask-backed)
+        - ``feature_path``: Filepath to Geojson with Polygons, which represent the Feature (e.g.: forested Areas)
+        - ``nonfeature_path``: Filepath to Geojson, which does not have the feature (e.g.: not forested Areas)
+        - ``path``: Directory of the training store
+        - ``bands`` (optional): List of Strings of desired Spectral Bands. If None, then takes all in the Dataset.
+        - ``block_size`` (optional): Number of rows and columns of a block
+        - ``dtype`` (optional): dtype of X in the store (default: float32)
+        - ``parquet_dir`` (optional): Directory for GeoParquet conversions of the Geojson files (see ``read_geometries``)
 
-    return X_train, X_test, y_train, y_test
\ No newline at end of file
+    Returns:
+    -------
+        - ``path``: Directory of the training store, open it with ``open_training_store``
+    '''
+    if bands == None:
+        bands = list(ds.data_vars)
+    masks = training_masks(ds, feature_path, nonfeature_path, parquet_dir)
+    n_rows = int(sum(mask.sum() for mask in masks))
+    blocks = iter_training_blocks(ds, masks, bands, block_size=block_size, dtype=dtype)
+    return write_training_store(path, blocks, n_rows, len(bands), dtype=dtype)
+
+def open_training_store(path:str) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Opens a training store (read only, memory mapped).
+
+    Params:
+    -------
+        - ``path``: Directory of the training store
+
+    Returns:
+    -------
+        - ``X, y``: Memory mapped samples and labels
+    '''
+    X = np.load(os.path.join(path, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(path, 'y.npy'), mmap_mode='r')
+    return X, y
+
+def partial_fit_blocks(estimator, blocks, classes:tuple=(0, 1), batch_size:int=None):
+    '''
+    Trains an estimator with ``partial_fit`` (e.g. sklearn.linear_model.SGDClassifier) on blocks of samples,
+    so the whole training set never has to be in memory.
+
+    Params:
+    -------
+        - ``estimator``: Estimator with a ``partial_fit(X, y, classes=...)`` method
+        - ``blocks``: Iterable of (X, y), e.g. from ``iter_training_blocks``,
+                      or the path of a training store (see ``build_training_store``)
+        - ``classes`` (optional): All class labels (default: (0, 1))
+        - ``batch_size`` (optional): Number of samples per ``partial_fit`` call when reading from a training store
+                                     (default: 100000)
+
+    Returns:
+    -------
+        - ``estimator``: The trained estimator
+    '''
+    if isinstance(blocks, str):
+        X_store, y_store = open_training_store(blocks)
+        batch_size = batch_size or 100_000
+        blocks = ((X_store[start:start + batch_size], y_store[start:start + batch_size])
+                  for start in range(0, len(X_store), batch_size))
+
+    for X, y in blocks:
+        estimator.partial_fit(X, y, classes=list(classes))
+    return estimator
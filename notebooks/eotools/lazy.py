@@ -0,0 +1,85 @@
+#Description
+'''
+This script is intended to simplify further processes in your code.
+In here you will find the helper which defers the import of heavy dependencies
+(xarray, rasterio, eodag, matplotlib, sklearn, ...) until they are used for the first time,
+so importing an ``eotools`` module stays fast (e.g. for batch workers which only need ``loading``).
+'''
+
+
+
+#Variables:
+__name__ = 'lazy'
+__version__ = '20-Jun-2024_v01'
+
+
+
+#Modules:
+import sys
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    '''
+    Placeholder for a module which is imported at the first attribute access.
+    Afterwards all attributes are taken from the imported module.
+    '''
+    def __init__(self, name:str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr:str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self) -> list:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded yet'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+def lazy_import(name:str) -> types.ModuleType:
+    '''
+    Import a module lazily: use it as ``xr = lazy_import('xarray')`` at module level instead of ``import xarray as xr``.
+    The module is imported when one of its attributes is used for the first time (e.g. ``xr.Dataset``).
+    Modules which are already imported are returned directly.
+    Submodules which only register something on import (e.g. the ``.rio`` accessor of ``rioxarray``)
+    have to be imported with a plain ``import`` inside of the function which needs them.
+
+    Params:
+    -------
+        - name: str -> absolute name of the module (e.g. 'xarray', 'matplotlib.pyplot')
+
+    Returns:
+    -------
+        - module: the module or a LazyModule placeholder
+    '''
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+def restore_module_names(namespace:dict) -> None:
+    '''
+    Point the functions and classes of a module to its real module path (e.g. 'eotools.loading').
+    The ``eotools`` modules overwrite ``__name__`` (e.g. 'loading'), so pickle would look for a top level module
+    of that name and the functions could not be sent to a process pool or the processes of a dask cluster.
+    Call it once at the end of the module: ``restore_module_names(globals())``.
+
+    Params:
+    -------
+        - namespace: dict -> globals() of the module
+    '''
+    spec = namespace.get('__spec__')
+    if spec is None:
+        return
+    for obj in list(namespace.values()):
+        if isinstance(obj, (types.FunctionType, type)) and obj.__module__ == namespace['__name__']:
+            obj.__module__ = spec.name
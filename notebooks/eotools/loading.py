@@ -6,6 +6,8 @@ In here you will find all the necessary functions to load data into xarray Datas
 
 
 
+from __future__ import annotations
+
 #Variables:
 __name__ = 'loading'
 __version__ = '20-Jun-2024_v01'
@@ -14,16 +16,44 @@ __version__ = '20-Jun-2024_v01'
 
 #Modules:
 import datetime as dt
-import xarray as xr
+import numpy as np
 import os
-from eodag.utils.exceptions import AddressNotFound
-from eodag import EOProduct, SearchResult, EODataAccessGateway
+import re
+import json
+import uuid
+import shutil
+import hashlib
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from functools import partial
+from itertools import chain
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+from .lazy import lazy_import, restore_module_names
+
+# Heavy dependencies are imported at their first use
+xr = lazy_import('xarray')
+rasterio = lazy_import('rasterio')
+rio_enums = lazy_import('rasterio.enums')
+rio_transform = lazy_import('rasterio.transform')
+rio_vrt = lazy_import('rasterio.vrt')
+rio_warp = lazy_import('rasterio.warp')
+rio_windows = lazy_import('rasterio.windows')
+eodag = lazy_import('eodag')
+eodag_utils = lazy_import('eodag.utils')
+eodag_exceptions = lazy_import('eodag.utils.exceptions')
+
+if TYPE_CHECKING:
+    from eodag import EOProduct, SearchResult, EODataAccessGateway
 
 
 def load_assets(root:str, res=60, only_spectral:bool=True, include_tci:bool=False) -> list[str]:
     '''
     Load all available assets/bands of a given product.
+    If the download directory has a catalog (see ``catalog.update_catalog``), the bands are read from it
+    instead of walking the product directory.
 
     Params:
     -------
@@ -36,9 +66,13 @@ def load_assets(root:str, res=60, only_spectral:bool=True, include_tci:bool=Fals
     -------
         - assets: list[str] -> list of available assets/bands
     '''
-    jp2_files = [file for dirs in os.walk(root, topdown=True)
-                     for file in dirs[2] if file.endswith(f"_{res}m.jp2")]
-    assets = [file.split('_')[2] for file in jp2_files if file.startswith('T')]
+    cataloged = _catalog_assets(root, res)
+    if cataloged is not None:
+        assets = [asset['band'] for asset in cataloged]
+    else:
+        jp2_files = [file for dirs in os.walk(root, topdown=True)
+                         for file in dirs[2] if file.endswith(f"_{res}m.jp2")]
+        assets = [file.split('_')[2] for file in jp2_files if file.startswith('T')]
 
     if only_spectral and include_tci==False:
         assets = [a for a in assets if a[0]=='B']
@@ -102,16 +136,438 @@ def load_multiple_timestamps(products:SearchResult, bands:list, *args, **kwargs)
     -------
         - ds: xarray.Dataset -> xarray Dataset containing the loaded bands from all products
     '''
-    # Empty List where datasets are stored
-    single_ds = []
-    for product in products:
-        # Load each dataarray and add to single_ds List
-        single_product = load_single_product(product=product, bands=bands, *args, **kwargs)
-        single_ds.append(single_product)
-    # Merge datasets from List
-    ds = xr.merge(single_ds)
+    # Sort the products by date, so every product is written into its final slot of the time stack
+    products = sorted(products, key=_product_date)
+    # Products are loaded one after another and written into the pre-allocated time stack
+    single_ds = (load_single_product(product=product, bands=bands, *args, **kwargs) for product in products)
+    ds = stack_timestamps(single_ds, n=len(products))
     return ds
 
+##############################################
+# Time stacking
+##############################################
+
+def _same_grid(template:xr.Dataset, ds:xr.Dataset) -> bool:
+    '''
+    Check if a single timestamp Dataset can be written into the time stack of ``template``.
+
+    Params:
+    -------
+        - template: xarray.Dataset -> first Dataset of the time stack
+        - ds: xarray.Dataset -> Dataset to be checked
+
+    Returns:
+    -------
+        - bool: True, if both Datasets have the same variables, shapes and (non-time) coordinates
+    '''
+    if ds.sizes.get('time') != 1 or set(ds.data_vars) != set(template.data_vars):
+        return False
+    for var in template.data_vars:
+        if ds[var].dims != template[var].dims or ds[var].shape != template[var].shape:
+            return False
+    for name, coord in template.coords.items():
+        if name == 'time':
+            continue
+        if name not in ds.coords or not coord.identical(ds.coords[name]):
+            return False
+    return True
+
+def _merged_dtype(dtype:np.dtype, n:int) -> np.dtype:
+    '''
+    dtype ``xr.merge`` returns for a band stacked from ``n`` timestamps.
+    Merging reindexes every timestamp to the full time axis, which promotes integer bands to floats.
+    '''
+    if n > 1 and np.issubdtype(dtype, np.integer):
+        return np.dtype(np.float32) if dtype.itemsize <= 2 else np.dtype(np.float64)
+    return dtype
+
+def stack_timestamps(datasets, n:int=None) -> xr.Dataset:
+    '''
+    Stack single timestamp Datasets (as returned by ``load_single_product(_regex)``) along the time dimension.
+    The (time, y, x) arrays of every band are allocated once and each Dataset is written into its slot, 
+    so no alignment or intermediate copies are needed. The result is the same as ``xr.merge(datasets)``.
+    If the grids of the Datasets disagree or a date occurs twice, the Datasets are merged with ``xr.merge`` instead.
+
+    Params:
+    -------
+        - datasets: list[xarray.Dataset]|Iterator[xarray.Dataset] -> Datasets with a time dimension of size 1. 
+                    A generator can be used, each Dataset is released after it has been written into the stack.
+        - n: int -> number of Datasets (only needed if ``datasets`` has no length)
+
+    Returns:
+    -------
+        - ds: xarray.Dataset -> Dataset with all timestamps, sorted by time
+    '''
+    if n is None:
+        datasets = list(datasets)
+        n = len(datasets)
+    datasets = iter(datasets)
+    template = next(datasets, None)
+    if template is None:
+        return xr.Dataset()
+    if any(template[var].dims[0] != 'time' for var in template.data_vars) or template.sizes.get('time') != 1:
+        return xr.merge(chain([template], datasets))
+
+    # Pre-allocate one array per band for all timestamps
+    stack = {var: np.empty((n,) + template[var].shape[1:], dtype=_merged_dtype(template[var].dtype, n))
+             for var in template.data_vars}
+    times = []
+
+    def to_dataset(length):
+        coords = {name: coord for name, coord in template.coords.items() if name != 'time'}
+        coords['time'] = np.array(times[:length])
+        data_vars = {var: (template[var].dims, stack[var][:length], template[var].attrs) for var in template.data_vars}
+        return xr.Dataset(data_vars, coords=coords, attrs=template.attrs)
+
+    for i, ds in enumerate(chain([template], datasets)):
+        time = ds['time'].values[0]
+        if i >= n or not _same_grid(template, ds) or time in times:
+            # Fall back to xr.merge for the already stacked part and all remaining Datasets
+            return xr.merge([to_dataset(i), ds, *datasets])
+        for var in template.data_vars:
+            stack[var][i] = ds[var].values[0]
+        times.append(time)
+
+    ds = to_dataset(len(times))
+    # xr.merge returns a sorted time axis
+    if not ds.indexes['time'].is_monotonic_increasing:
+        ds = ds.sortby('time')
+    return ds
+
+
+##############################################
+# Resolved asset index
+##############################################
+
+# Name of the file in the product root where the resolved asset index is persisted
+ASSET_INDEX_FILE = 'eotools_assets.json'
+
+# Same naming convention as used by ``load_assets`` and ``band_2_regex`` (e.g.: T33UWP_20240501T100031_B04_10m.jp2)
+_ASSET_PATTERN = re.compile(r'^(?!.*MSK)T[^_]+_[^_]+_(?P<band>[^_]+)_(?P<res>[0-9]+)m\.jp2$')
+
+# Asset indexes already loaded in this session (product root -> index)
+_asset_indexes = {}
+
+def walk_assets(root:str|Path):
+    '''
+    Walk the directory of a downloaded product and yield every band file with its native resolution.
+
+    Params:
+    -------
+        - root: str|Path -> root directory of a downloaded product in SAFE format
+
+    Returns:
+    -------
+        - Generator of (band, resolution, path) tuples, path is the absolute filepath
+    '''
+    for dirpath, _, files in os.walk(root, topdown=True):
+        for file in files:
+            match = _ASSET_PATTERN.match(file)
+            if match is not None:
+                yield match['band'], int(match['res']), os.path.join(dirpath, file)
+
+def _catalog_assets(root:str|Path, resolution:int=None) -> list[dict]|None:
+    '''
+    Band files of a product from the catalog of its download directory (see ``catalog.update_catalog``).
+    Returns None if there is no catalog or the product is not in it.
+    '''
+    from .catalog import CATALOG_FILE, query_assets
+
+    root = Path(root)
+    db = root.parent / CATALOG_FILE
+    if not db.is_file():
+        return None
+    assets = query_assets(db, product_id=root.name.removesuffix('.SAFE'))
+    if not assets:
+        return None
+    return [asset for asset in assets if resolution is None or asset['resolution'] == resolution]
+
+def build_asset_index(root:str|Path, use_catalog:bool=True) -> dict:
+    '''
+    Walk the directory of a downloaded product once and resolve every band to its file.
+    If the download directory has a catalog (see ``catalog.update_catalog``), the band files are read from it
+    instead of walking the product directory.
+    If a band is available in several resolutions, the finest resolution is kept 
+    (same order as the regex patterns of ``band_2_regex``).
+
+    Params:
+    -------
+        - root: str|Path -> root directory of a downloaded product in SAFE format
+        - use_catalog: bool -> if False, the product directory is always walked
+
+    Returns:
+    -------
+        - index: dict -> {band: {'path': path relative to root, 'resolution': native resolution in m}}
+    '''
+    cataloged = _catalog_assets(root) if use_catalog else None
+    if cataloged is not None:
+        assets = [(asset['band'], asset['resolution'], asset['path']) for asset in cataloged]
+    else:
+        assets = walk_assets(root)
+
+    index = {}
+    for band, res, path in assets:
+        if band not in index or res < index[band]['resolution']:
+            index[band] = {'path': os.path.relpath(path, root), 'resolution': res}
+    return index
+
+def get_asset_index(product, rebuild:bool=False) -> dict:
+    '''
+    Get the resolved asset index of a downloaded product.
+    The index is built once with ``build_asset_index`` and persisted as ``ASSET_INDEX_FILE`` 
+    in the product root, so later sessions do not need to walk the product again.
+
+    Params:
+    -------
+        - product: EOProduct -> downloaded product (``product.location`` has to point to the local file system)
+        - rebuild: bool -> if True, ignores the persisted index and walks the product again
+
+    Returns:
+    -------
+        - index: dict -> {band: {'path': path relative to root, 'resolution': native resolution in m}}
+    '''
+    root = Path(eodag_utils.uri_to_path(product.location))
+    key = str(root)
+    if not rebuild and key in _asset_indexes:
+        return _asset_indexes[key]
+
+    index_file = root / ASSET_INDEX_FILE
+    index = None
+    if not rebuild and index_file.is_file():
+        with index_file.open('r') as f:
+            index = json.load(f)
+
+    if index is None:
+        # A rebuild walks the product, the catalog may be as outdated as the persisted index
+        index = build_asset_index(root, use_catalog=not rebuild)
+        try:
+            with index_file.open('w') as f:
+                json.dump(index, f)
+        except OSError:
+            # Read-only product directories still get the in-memory index
+            pass
+
+    _asset_indexes[key] = index
+    return index
+
+def resolve_band(product, band:str) -> tuple[str, int]:
+    '''
+    Resolve a band of a downloaded product to its file and native resolution.
+
+    Params:
+    -------
+        - product: EOProduct -> downloaded product
+        - band: str -> band name (e.g.: 'B04', 'SCL', 'TCI')
+
+    Returns:
+    -------
+        - (path, resolution): tuple[str, int] -> absolute filepath and native resolution in m
+    '''
+    root = Path(eodag_utils.uri_to_path(product.location))
+    index = get_asset_index(product)
+    # A persisted index can be outdated if the product has been re-extracted or bands have been added,
+    # it is rebuilt once before a band is reported as missing
+    if band not in index or not (root / index[band]['path']).is_file():
+        index = get_asset_index(product, rebuild=True)
+    if band not in index:
+        raise eodag_exceptions.AddressNotFound(f'Band {band} not found in {root}')
+    return str(root / index[band]['path']), index[band]['resolution']
+
+def _get_band_data(product, band:str, cache:str|None=None, cache_size:int=None, **kwargs) -> xr.DataArray:
+    '''
+    Call ``get_data`` of the EOProduct for a single band.
+    Downloaded products are resolved with the asset index, so only the matching file is requested.
+    Products which are not downloaded fall back to the regex patterns of ``band_2_regex``.
+
+    Params:
+    -------
+        - product: EOProduct -> product to be loaded
+        - band: str -> band to be loaded
+        - cache: str|None -> cache directory (``workspace['cache']``), if None the cache is not used
+        - cache_size: int -> maximum size of the cache directory in bytes (defaults to ``CACHE_SIZE``)
+        - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
+
+    Returns:
+    -------
+        - data: xarray.DataArray -> DataArray returned by ``get_data``
+    '''
+    if cache is not None:
+        key = cache_key(product, band, **kwargs)
+        data = read_cache(cache, key)
+        if data is not None:
+            return data
+
+    if product.location.startswith('file://'):
+        path, _ = resolve_band(product, band)
+        data = product.get_data(band=rf'^.*{re.escape(os.path.basename(path))}$', **kwargs)
+    else:
+        for r in band_2_regex(band=band):
+            try:
+                data = product.get_data(band=r, **kwargs)
+                break
+            except eodag_exceptions.AddressNotFound:
+                continue
+        else:
+            raise eodag_exceptions.AddressNotFound(f'Band {band} not found in {product.location} (tried 10m, 20m and 60m)')
+
+    if cache is not None:
+        write_cache(cache, key, data, cache_size=cache_size)
+    return data
+
+##############################################
+# Cube cache
+##############################################
+
+# Default maximum size of the cache directory in bytes (20 GB)
+CACHE_SIZE = 20 * 1024**3
+
+# A full cache is evicted down to this fraction of its maximum size, so eviction does not run on every write
+CACHE_LOW_WATERMARK = 0.9
+
+# Name of the file in a cache entry which holds the size of the entry in bytes
+ENTRY_SIZE_FILE = '.eotools_size'
+
+# Size of the cache directories as known by this session (cache directory -> bytes), updated on every write
+_cache_totals = {}
+_cache_lock = threading.Lock()
+
+def cache_key(product, band:str, **kwargs) -> str:
+    '''
+    Hash of a loaded band: product id, band and the ``common_params`` used to load it.
+    For downloaded products the modification time and size of the band file are part of the key,
+    so a re-downloaded or replaced product is not served from an outdated entry.
+
+    Params:
+    -------
+        - product: EOProduct
+        - band: str -> band name
+        - **kwargs: dict -> arguments passed to the ``get_data`` method of the EOProduct (``common_params``)
+
+    Returns:
+    -------
+        - key: str -> hex digest used as name of the cache entry
+    '''
+    # CRS objects are hashed by their string representation (e.g.: 'EPSG:4326')
+    params = {name: str(value) for name, value in kwargs.items()}
+    source = None
+    if product.location.startswith('file://'):
+        stat = os.stat(resolve_band(product, band)[0])
+        source = [stat.st_mtime_ns, stat.st_size]
+    payload = json.dumps({'id': product.properties['id'], 'band': band, 'params': params, 'source': source}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def read_cache(cache:str, key:str) -> xr.DataArray|None:
+    '''
+    Read an already reprojected band from the cache directory.
+
+    Params:
+    -------
+        - cache: str -> cache directory (``workspace['cache']``)
+        - key: str -> key of the entry (see ``cache_key``)
+
+    Returns:
+    -------
+        - data: xarray.DataArray|None -> cached band or None if the entry does not exist
+    '''
+    path = Path(cache) / f'{key}.zarr'
+    if not path.is_dir():
+        return None
+    # Keep the stored values (no masking/scaling) and restore the crs from the spatial_ref variable
+    ds = xr.open_zarr(path, mask_and_scale=False, decode_coords='all')
+    # Restore the name of the loaded band, the entry always stores it as 'data'
+    data = ds['data'].load().rename(ds.attrs.get('name'))
+    # The modification time of the entry is used for the least recently used eviction
+    os.utime(path)
+    return data
+
+def write_cache(cache:str, key:str, data:xr.DataArray, cache_size:int=None) -> None:
+    '''
+    Write a band into the cache directory and evict the least recently used entries
+    if the cache gets larger than ``cache_size``.
+    The size of the cache directory is only measured once per session, afterwards the sizes of the written
+    entries are added up, and the cache is only evicted when the total exceeds ``cache_size``.
+
+    Params:
+    -------
+        - cache: str -> cache directory (``workspace['cache']``)
+        - key: str -> key of the entry (see ``cache_key``)
+        - data: xarray.DataArray -> band to be cached
+        - cache_size: int -> maximum size of the cache directory in bytes (defaults to ``CACHE_SIZE``)
+
+    Returns:
+    -------
+        - None
+    '''
+    cache = Path(cache)
+    cache.mkdir(parents=True, exist_ok=True)
+    path = cache / f'{key}.zarr'
+    cache_size = CACHE_SIZE if cache_size is None else cache_size
+
+    # Write into a temporary entry first, so concurrent loads never read a half written entry.
+    # Coordinates get no _FillValue, so a cached band is identical to a freshly loaded one.
+    tmp = cache / f'.{key}.{uuid.uuid4().hex}.tmp'
+    encoding = {name: {'_FillValue': None} for name in data.coords if name in data.dims}
+    ds = data.to_dataset(name='data')
+    ds.attrs['name'] = data.name
+    ds.to_zarr(tmp, mode='w', encoding=encoding)
+    size = _dir_size(tmp)
+    (tmp / ENTRY_SIZE_FILE).write_text(str(size))
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # Another worker has written the same entry in the meantime
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+
+    with _cache_lock:
+        name = str(cache.resolve())
+        if name not in _cache_totals:
+            _cache_totals[name] = sum(_entry_size(entry) for entry in cache.glob('*.zarr'))
+        else:
+            _cache_totals[name] += size
+        if _cache_totals[name] > cache_size:
+            _cache_totals[name] = evict_cache(cache, cache_size)
+
+def _dir_size(path:Path) -> int:
+    '''
+    Size of all files in a directory in bytes.
+    '''
+    return sum(os.path.getsize(os.path.join(dirpath, file)) 
+               for dirpath, _, files in os.walk(path) for file in files)
+
+def _entry_size(entry:Path) -> int:
+    '''
+    Size of a cache entry in bytes, as recorded by ``write_cache`` (measured for entries without a record).
+    '''
+    try:
+        return int((entry / ENTRY_SIZE_FILE).read_text())
+    except (OSError, ValueError):
+        return _dir_size(entry)
+
+def evict_cache(cache:str, cache_size:int=CACHE_SIZE) -> int:
+    '''
+    If the cache directory is larger than ``cache_size``, delete the least recently used entries
+    until it is smaller than ``CACHE_LOW_WATERMARK * cache_size``.
+
+    Params:
+    -------
+        - cache: str -> cache directory (``workspace['cache']``)
+        - cache_size: int -> maximum size of the cache directory in bytes
+
+    Returns:
+    -------
+        - total: int -> size of the cache directory in bytes after the eviction
+    '''
+    entries = [(entry.stat().st_mtime, _entry_size(entry), entry) for entry in Path(cache).glob('*.zarr')]
+    total = sum(size for _, size, _ in entries)
+    if total <= cache_size:
+        return total
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= CACHE_LOW_WATERMARK * cache_size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+    return total
 
 ##############################################
 # Regex functions
@@ -137,7 +593,324 @@ def band_2_regex(band:str) -> tuple[str]:
     r60 = rf'^(?!.*MSK).*{band}_60m.jp2$'
     return r10, r20, r60
 
-def load_single_product_regex(product, bands:list[str], **kwargs) -> xr.Dataset:
+def _load_band_regex(product, band:str, **kwargs) -> xr.DataArray:
+    '''
+    Load a single band of a single product using regex patterns and prepare it for the time stack.
+
+    Params:
+    -------
+        - product: EOProduct -> product to be loaded
+        - band: str -> band to be loaded
+        - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
+
+    Returns:
+    -------
+        - data: xarray.DataArray -> squeezed DataArray named after the band with a single timestamp
+    '''
+    # Load Band into an xarray Dataarray
+    data = _get_band_data(product, band, **kwargs)
+
+    # Get rid of Dimensions of size 1 [e.g.: shapes from (1,300,500) to (300,500)]
+    data = data.squeeze()
+
+    # Add a timestamp to the xarray dataarray (taken from product properties)
+    data = data.expand_dims(dim={'time':[_product_date(product)]})
+
+    # Name the Dataarray (band name is used) -> Dataset uses the Dataarray name to name its variables
+    data.name = band
+    return data
+
+def _product_date(product) -> dt.date:
+    '''
+    Get the sensing date of a product from its properties.
+
+    Params:
+    -------
+        - product: EOProduct
+
+    Returns:
+    -------
+        - date: datetime.date -> date used for the time axis of the loaded Datasets
+    '''
+    time_str = product.properties['startTimeFromAscendingNode']
+    date = dt.datetime.strptime(time_str,'%Y-%m-%dT%H:%M:%S.%f%z')
+    return date.date()
+
+def _get_pool(executor:str, workers:int|None):
+    '''
+    Create the pool used to load bands concurrently.
+
+    Params:
+    -------
+        - executor: str -> 'thread' or 'process'
+        - workers: int|None -> maximum number of concurrent loads (None uses the default of ``concurrent.futures``)
+
+    Returns:
+    -------
+        - pool: concurrent.futures.Executor
+    '''
+    if executor == 'thread':
+        return ThreadPoolExecutor(max_workers=workers)
+    elif executor == 'process':
+        return ProcessPoolExecutor(max_workers=workers)
+    else:
+        raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}.")
+
+##############################################
+# Scene classification mask
+##############################################
+
+# SCL classes masked by default: no data, saturated or defective, cloud shadows,
+# cloud medium probability, cloud high probability and thin cirrus
+SCL_INVALID = (0, 1, 3, 8, 9, 10)
+# SCL class of the pixels without data (e.g. outside the swath), not counted for the valid fraction
+SCL_NO_DATA = 0
+
+def scl_valid_mask(product, invalid_classes:tuple=SCL_INVALID, **kwargs) -> xr.DataArray:
+    '''
+    Read the scene classification layer (SCL, 20m) of a L2A product on the ``common_params`` grid
+    and mark the pixels whose class is not in ``invalid_classes``.
+
+    Params:
+    -------
+        - product: EOProduct -> product to be loaded
+        - invalid_classes: tuple -> SCL classes which are masked (default: no data, defective, cloud shadows, clouds, cirrus)
+        - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
+
+    Returns:
+    -------
+        - valid: xarray.DataArray -> boolean (y, x) DataArray, True for valid pixels. The attribute ``valid_fraction``
+                holds the fraction of valid pixels among the pixels with data (SCL no data outside the swath is not counted).
+    '''
+    scl = _get_band_data(product, 'SCL', **kwargs).squeeze()
+    valid = ~scl.isin(list(invalid_classes))
+    n_data = int((scl != SCL_NO_DATA).sum())
+    valid = valid.reset_coords(drop=True)
+    valid.attrs = {'valid_fraction': int((valid & (scl != SCL_NO_DATA)).sum()) / n_data if n_data else 0.0}
+    return valid
+
+def _align_mask(valid:xr.DataArray, ds:xr.Dataset) -> xr.DataArray:
+    '''
+    Bring a SCL mask onto the grid of the loaded bands (nearest neighbour), e.g. the 20m SCL onto native 10m bands.
+    '''
+    if valid['x'].equals(ds['x']) and valid['y'].equals(ds['y']):
+        return valid
+    return valid.reindex(x=ds['x'], y=ds['y'], method='nearest').astype(bool)
+
+def _mask_dataset(ds:xr.Dataset, valid:xr.DataArray) -> xr.Dataset:
+    '''
+    Set the invalid pixels of all bands to NaN. Integer bands are converted to float32.
+    Dask-backed bands stay lazy.
+    '''
+    valid = _align_mask(valid, ds)
+    masked = {}
+    for var, data in ds.data_vars.items():
+        if not np.issubdtype(data.dtype, np.floating):
+            data = data.astype(np.float32)
+        masked[var] = data.where(valid)
+    return ds.assign(masked)
+
+def _assign_valid_fraction(ds:xr.Dataset, products:list, fractions:list[float]) -> xr.Dataset:
+    '''
+    Add the fraction of valid pixels (among the pixels with data) of every product as ``valid_fraction`` coordinate 
+    along the time dimension.
+    Products with the same date (merged into one timestamp) get the highest fraction.
+    '''
+    if 'time' not in ds.dims:
+        return ds
+    fraction = xr.DataArray(fractions, dims='time', coords={'time': [_product_date(product) for product in products]})
+    fraction = fraction.groupby('time').max().reindex(time=ds['time'].values)
+    return ds.assign_coords(valid_fraction=('time', fraction.values))
+
+def _scl_masks(products:list, invalid_classes:tuple, workers:int|None=1, executor:str='thread',
+               **kwargs) -> tuple[list[xr.DataArray], list[float]]:
+    '''
+    Read the SCL masks of all products (one SCL read per product) and compute their fractions of valid pixels.
+    '''
+    if workers == 1:
+        masks = [scl_valid_mask(product, invalid_classes, **kwargs) for product in products]
+    else:
+        with _get_pool(executor, workers) as pool:
+            masks = list(pool.map(partial(scl_valid_mask, invalid_classes=invalid_classes, **kwargs), products))
+    fractions = [valid.attrs['valid_fraction'] for valid in masks]
+    return masks, fractions
+
+##############################################
+# Lazy loading
+##############################################
+
+def _load_band_values(product, band:str, shape:tuple, **kwargs) -> np.ndarray:
+    '''
+    Load a single band and return its values. Called by dask when a lazy band is computed.
+
+    Params:
+    -------
+        - product: EOProduct -> product to be loaded
+        - band: str -> band to be loaded
+        - shape: tuple -> shape the band has been declared with in the lazy Dataset
+        - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
+
+    Returns:
+    -------
+        - values: np.ndarray -> values of the band with the shape (time, [band,] y, x)
+    '''
+    data = _load_band_regex(product, band, **kwargs)
+    if data.shape != shape:
+        raise ValueError(f'Band {band} of {product.properties["id"]} has the shape {data.shape}, '
+                         f'but the lazy Dataset expected {shape}. Use the same ``common_params`` for all products.')
+    return data.values
+
+def _lazy_layouts(product, bands:list[str], **kwargs) -> tuple[xr.DataArray, dict, dict]:
+    '''
+    Get the grid, dtype and number of channels of the bands to build a lazy Dataset.
+    Only the first band is read to get the grid (all bands share the ``common_params`` grid).
+    For downloaded products dtype and channels are taken from the file header, 
+    otherwise the band has to be read as well.
+
+    Params:
+    -------
+        - product: EOProduct -> product used as template
+        - bands: list[str] -> list of bands to be loaded
+        - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
+
+    Returns:
+    -------
+        - grid: xarray.DataArray -> 2D DataArray with the x/y coordinates and the crs of the loaded bands
+        - layouts: dict -> {band: (dtype, channels)}
+        - loaded: dict -> {band: xarray.DataArray} bands of ``product`` which already have been read
+    '''
+    loaded = {bands[0]: _load_band_regex(product, bands[0], **kwargs)}
+    grid = loaded[bands[0]].isel(time=0, drop=True)
+    if 'band' in grid.dims:
+        grid = grid.isel(band=0, drop=True)
+
+    layouts = {}
+    for band in bands:
+        if band not in loaded and product.location.startswith('file://'):
+            path, _ = resolve_band(product, band)
+            with rasterio.open(path) as src:
+                layouts[band] = (np.dtype(src.dtypes[0]), src.count)
+            continue
+        if band not in loaded:
+            loaded[band] = _load_band_regex(product, band, **kwargs)
+        layouts[band] = (loaded[band].dtype, loaded[band].sizes.get('band', 1))
+    return grid, layouts, loaded
+
+def _read_band_window(path:str, grid:dict, dtype, block_info=None) -> np.ndarray:
+    '''
+    Read the window of a band file which covers a single dask block of a lazy band.
+    The file is warped onto the ``common_params`` grid (nearest neighbour), only the pixels of the window are decoded.
+
+    Params:
+    -------
+        - path: str -> filepath of the band
+        - grid: dict -> crs, transform, width and height of the grid (see ``_grid_params``)
+        - dtype: numpy.dtype -> dtype of the band
+        - block_info: dict -> location of the block, passed by ``dask.array.map_blocks``
+
+    Returns:
+    -------
+        - values: np.ndarray -> values of the block with the shape (1, [band,] y, x)
+    '''
+    info = block_info[None]
+    (row_start, row_stop), (col_start, col_stop) = info['array-location'][-2:]
+    window = rio_windows.Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+    with rasterio.open(path) as src:
+        if src.crs == grid['crs'] and src.transform == grid['transform']:
+            values = src.read(window=window, boundless=True, fill_value=0)
+        else:
+            nodata = src.nodata if src.nodata is not None else 0
+            with rio_vrt.WarpedVRT(src, crs=grid['crs'], transform=grid['transform'], width=grid['width'],
+                                   height=grid['height'], src_nodata=nodata, nodata=nodata) as vrt:
+                values = vrt.read(window=window)
+    return values.reshape(info['chunk-shape']).astype(dtype, copy=False)
+
+def _grid_params(grid:xr.DataArray) -> dict:
+    '''
+    crs, transform, width and height of the grid of a loaded band (needs the ``.rio`` accessor).
+    '''
+    import rioxarray
+    return {'crs': grid.rio.crs, 'transform': grid.rio.transform(), 'width': grid.sizes['x'], 'height': grid.sizes['y']}
+
+def _lazy_band_regex(product, band:str, grid:xr.DataArray, dtype, channels:int, chunks:dict|None=None, **kwargs) -> xr.DataArray:
+    '''
+    Create a dask-backed DataArray of a single band. The band is only read when it is computed.
+    For downloaded products every dask block reads only its own window of the band file (see ``_read_band_window``),
+    so with spatial chunks (e.g.: {'x': 1024, 'y': 1024}) a spatial subset only decodes the selected blocks.
+    Products which are not downloaded are read completely by ``get_data`` when the band is computed.
+
+    Params:
+    -------
+        - product: EOProduct -> product to be loaded
+        - band: str -> band to be loaded
+        - grid: xarray.DataArray -> 2D DataArray with the coordinates of the ``common_params`` grid (see ``_lazy_layouts``)
+        - dtype: numpy.dtype -> dtype of the band
+        - channels: int -> number of channels of the band (e.g.: 3 for TCI)
+        - chunks: dict|None -> chunk sizes per dimension (e.g.: {'x': 1024, 'y': 1024}), None keeps a single chunk per band
+        - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
+
+    Returns:
+    -------
+        - data: xarray.DataArray -> lazy DataArray with the same layout as returned by ``_load_band_regex``
+    '''
+    import dask
+    import dask.array as da
+
+    coords = dict(grid.coords)
+    coords['time'] = [_product_date(product)]
+    if channels > 1:
+        dims = ('time', 'band', 'y', 'x')
+        shape = (1, channels) + grid.shape
+        coords['band'] = np.arange(1, channels + 1)
+    else:
+        dims = ('time', 'y', 'x')
+        shape = (1,) + grid.shape
+    block_shape = tuple((chunks or {}).get(dim, -1) if dim in ('y', 'x') else -1 for dim in dims)
+
+    if product.location.startswith('file://'):
+        path, _ = resolve_band(product, band)
+        array = da.map_blocks(_read_band_window, path, _grid_params(grid), dtype, dtype=dtype,
+                              chunks=da.core.normalize_chunks(block_shape, shape, dtype=dtype))
+    else:
+        values = dask.delayed(_load_band_values)(product, band, shape, **kwargs)
+        array = da.from_delayed(values, shape=shape, dtype=dtype)
+        if chunks:
+            array = array.rechunk(block_shape)
+
+    data = xr.DataArray(array, dims=dims, coords=coords, attrs=grid.attrs, name=band)
+    return data
+
+def _lazy_product_regex(product, bands:list[str], grid:xr.DataArray, layouts:dict, loaded:dict|None=None,
+                        chunks:dict|None=None, **kwargs) -> xr.Dataset:
+    '''
+    Create a dask-backed Dataset of a single product.
+
+    Params:
+    -------
+        - product: EOProduct -> product to be loaded
+        - bands: list[str] -> list of bands to be loaded
+        - grid, layouts, loaded: -> output of ``_lazy_layouts``, ``loaded`` has to belong to ``product``
+        - chunks: dict|None -> chunk sizes per dimension, None keeps a single chunk per band
+        - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
+
+    Returns:
+    -------
+        - ds: xarray.Dataset -> lazy Dataset containing the bands
+    '''
+    loaded = loaded or {}
+    arrays = {}
+    for band in bands:
+        if band in loaded:
+            # Already read to get the layout, no need to read it again
+            arrays[band] = loaded[band].chunk(chunks or {})
+        else:
+            arrays[band] = _lazy_band_regex(product, band, grid, *layouts[band], chunks=chunks, **kwargs)
+    ds = xr.Dataset(arrays)
+    return ds
+
+def load_single_product_regex(product, bands:list[str], workers:int|None=1, executor:str='thread',
+                              lazy:bool=False, chunks:dict|None=None, cache:str|None=None, cache_size:int=CACHE_SIZE,
+                              scl_mask:bool=False, invalid_classes:tuple=SCL_INVALID, **kwargs) -> xr.Dataset:
     '''
     Load multiple bands of a single product into an xarray Dataset using regex patterns.
 
@@ -145,87 +918,373 @@ def load_single_product_regex(product, bands:list[str], **kwargs) -> xr.Dataset:
     -------
         - product: EOProduct -> product to be loaded
         - bands: list[str] -> list of bands to be loaded (provided by ``load_assets`` function)
+        - workers: int|None -> number of bands loaded concurrently (1 loads the bands one after another)
+        - executor: str -> 'thread' or 'process' pool used if ``workers`` is not 1
+        - lazy: bool -> if True, returns a dask-backed Dataset. Only the first band is read right away (to get the grid),
+                        all other bands are read on ``.compute()``/``.load()`` or when their values are accessed.
+                        ``workers`` and ``executor`` are ignored, the dask scheduler is used instead.
+        - chunks: dict|None -> chunk sizes of the lazy Dataset (e.g.: {'x': 1024, 'y': 1024}), 
+                               None keeps a single chunk per band
+        - cache: str|None -> cache directory (``workspace['cache']``). Loaded bands are stored there as Zarr, 
+                             keyed by product id, band and ``common_params``, and read from there on the next load.
+        - cache_size: int -> maximum size of the cache directory in bytes, least recently used entries are deleted
+        - scl_mask: bool -> if True, the scene classification layer (SCL) is read once, resampled to the grid of the bands
+                            and pixels of ``invalid_classes`` are set to NaN in all bands (integer bands become float32).
+                            The fraction of valid pixels (among the pixels with data) is added as ``valid_fraction`` coordinate.
+        - invalid_classes: tuple -> SCL classes which are masked (see ``SCL_INVALID``)
         - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
 
     Returns:
     -------
         - ds: xarray.Dataset -> xarray Dataset containing the loaded bands
     '''
-    loaded_data = {}
-    for band in bands:
-        regex = band_2_regex(band=band)
-        # Load Band into an xarray Dataarray
-        for r in regex:
-            try:
-                data = product.get_data(band=r, **kwargs)
-                break
-            except:
-                AddressNotFound
-        
-        # Get rid of Dimensions of size 1 [e.g.: shapes from (1,300,500) to (300,500)]
-        data = data.squeeze()
+    if cache is not None:
+        kwargs.update(cache=cache, cache_size=cache_size)
 
-        # Get time information from the product properties
-        time_str = product.properties['startTimeFromAscendingNode']
-        date = dt.datetime.strptime(time_str,'%Y-%m-%dT%H:%M:%S.%f%z')
+    if scl_mask:
+        valid = scl_valid_mask(product, invalid_classes, **kwargs)
+        ds = load_single_product_regex(product, bands, workers=workers, executor=executor, lazy=lazy, chunks=chunks, **kwargs)
+        return _assign_valid_fraction(_mask_dataset(ds, valid), [product], [valid.attrs['valid_fraction']])
 
-        # Add a timestamp to the xarray dataarray (taken from product properties)
-        data = data.expand_dims(dim={'time':[date.date()]})
+    if lazy:
+        grid, layouts, loaded = _lazy_layouts(product, bands, **kwargs)
+        return _lazy_product_regex(product, bands, grid, layouts, loaded, chunks=chunks, **kwargs)
 
-        # Name the Dataarray (band name is used) -> Dataset uses the Dataarray name to name its variables
-        data.name = band
+    if workers == 1:
+        arrays = [_load_band_regex(product, band, **kwargs) for band in bands]
+    else:
+        # Pool.map keeps the order of the bands
+        with _get_pool(executor, workers) as pool:
+            arrays = list(pool.map(partial(_load_band_regex, product, **kwargs), bands))
 
-        # Add Dataarray of a single band to the loaded_data dictionary
-        loaded_data[band] = data
     # Create a xarray Dataset from a dictionary of Dataarrays
-    ds = xr.Dataset(loaded_data)
+    ds = xr.Dataset({band: data for band, data in zip(bands, arrays)})
     return ds
 
-def load_multiple_timestamps_regex(products, bands:list, **kwargs) -> xr.Dataset:
+def load_multiple_timestamps_regex(products, bands:list, workers:int|None=1, executor:str='thread',
+                                   lazy:bool=False, chunks:dict|None=None, cache:str|None=None, cache_size:int=CACHE_SIZE,
+                                   scl_mask:bool=False, invalid_classes:tuple=SCL_INVALID, min_valid_fraction:float=0.0,
+                                   **kwargs) -> xr.Dataset:
     '''
     Load multiple bands of multiple products into an xarray Dataset using regex patterns.
+    If ``workers`` is not 1, every (product, band) pair is loaded on a thread or process pool. 
+    At most ``workers`` bands are decoded at the same time and the time axis is the same as for the sequential load.
 
     Params:
     -------
         - products: list[EOProduct] -> list of products to be loaded
         - bands: list[str] -> list of bands to be loaded (provided by ``load_assets`` function)
+        - workers: int|None -> number of bands loaded concurrently (1 loads the bands one after another)
+        - executor: str -> 'thread' or 'process' pool used if ``workers`` is not 1
+        - lazy: bool -> if True, returns a dask-backed Dataset (chunked per product and band).
+                        Only the first band of the first product is read right away (to get the grid), 
+                        everything else is read on ``.compute()``/``.load()``, so selecting a subset 
+                        (e.g.: ``ds.sel(time=...)``) only reads the selected products and bands.
+                        ``workers`` and ``executor`` are ignored, the dask scheduler is used instead.
+        - chunks: dict|None -> spatial chunk sizes of the lazy Dataset (e.g.: {'x': 1024, 'y': 1024}). For downloaded
+                               products every chunk only reads its window of the band file, None keeps a single chunk
+                               per product and band
+        - cache: str|None -> cache directory (``workspace['cache']``). Loaded bands are stored there as Zarr, 
+                             keyed by product id, band and ``common_params``, and read from there on the next load.
+        - cache_size: int -> maximum size of the cache directory in bytes, least recently used entries are deleted
+        - scl_mask: bool -> if True, the scene classification layer (SCL) of every product is read first (once per product),
+                            resampled to the grid of the bands and pixels of ``invalid_classes`` are set to NaN in all bands.
+                            The fraction of valid pixels per product is added as ``valid_fraction`` coordinate (along time),
+                            pixels without data (SCL no data, e.g. outside the swath) are not counted.
+        - invalid_classes: tuple -> SCL classes which are masked (see ``SCL_INVALID``)
+        - min_valid_fraction: float -> products with a smaller fraction of valid pixels (e.g. fully clouded) are skipped
+                                       before any of their other bands is read (only used with ``scl_mask``)
         - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
 
     Returns:
     -------
         - ds: xarray.Dataset -> xarray Dataset containing the loaded bands from all products
     '''
-    # Empty List where datasets are stored
-    single_ds = []
-    for product in products:
-        # Load each dataarray and add to single_ds List
-        single_product = load_single_product_regex(product=product, bands=bands, **kwargs)
-        single_ds.append(single_product)
-    # Merge datasets from List
-    ds = xr.merge(single_ds)
+    if cache is not None:
+        kwargs.update(cache=cache, cache_size=cache_size)
+
+    # Sort the products by date, so every product is written into its final slot of the time stack
+    products = sorted(products, key=_product_date)
+
+    masks = fractions = None
+    if scl_mask:
+        masks, fractions = _scl_masks(products, invalid_classes, workers=workers, executor=executor, **kwargs)
+        keep = [i for i, fraction in enumerate(fractions) if fraction >= min_valid_fraction]
+        products, masks, fractions = [products[i] for i in keep], [masks[i] for i in keep], [fractions[i] for i in keep]
+        if not products:
+            return xr.Dataset()
+
+    def masked(datasets):
+        # Apply the SCL mask of each product before it is stacked
+        if masks is None:
+            return datasets
+        return (_mask_dataset(ds, valid) for ds, valid in zip(datasets, masks))
+
+    if lazy:
+        grid, layouts, loaded = _lazy_layouts(products[0], bands, **kwargs)
+        single_ds = [_lazy_product_regex(product, bands, grid, layouts, loaded if i == 0 else None,
+                                         chunks=chunks, **kwargs)
+                     for i, product in enumerate(products)]
+        # xr.merge would compare the overlapping values and thereby compute them, concat stays lazy
+        ds = xr.concat(list(masked(single_ds)), dim='time').sortby('time')
+        # Same dtypes as the eager time stack (see ``stack_timestamps``)
+        ds = ds.assign({var: ds[var].astype(_merged_dtype(ds[var].dtype, len(products))) for var in ds.data_vars})
+        if fractions is not None:
+            ds = _assign_valid_fraction(ds, products, fractions)
+        return ds
+
+    if workers == 1:
+        # Products are loaded one after another and written into the pre-allocated time stack
+        single_ds = (load_single_product_regex(product=product, bands=bands, **kwargs) for product in products)
+    else:
+        # Fan out all (product, band) pairs, Pool.map returns them in submission order
+        pairs = [(product, band) for product in products for band in bands]
+        with _get_pool(executor, workers) as pool:
+            arrays = list(pool.map(partial(_load_band_regex, **kwargs),
+                                   [p for p, _ in pairs], [b for _, b in pairs]))
+
+        # Regroup the bands of each product into a Dataset
+        n = len(bands)
+        single_ds = [xr.Dataset(dict(zip(bands, arrays[i*n:(i+1)*n]))) for i in range(len(products))]
+
+    ds = stack_timestamps(masked(single_ds), n=len(products))
+    if fractions is not None:
+        ds = _assign_valid_fraction(ds, products, fractions)
     return ds
 
-def get_data_regex(product, band:str, **kwargs):
+def get_data_regex(product, band:str, cache:str|None=None, cache_size:int=CACHE_SIZE, **kwargs):
     '''
     Load a single band of a single product using regex patterns.
+    Downloaded products are resolved with the asset index (see ``get_asset_index``).
+    Raises AddressNotFound if the band is not available, other errors of ``get_data`` are not hidden.
 
     Params:
     -------
         - product: EOProduct -> product to be loaded
         - band: str -> band to be loaded
+        - cache: str|None -> cache directory (``workspace['cache']``), see ``load_multiple_timestamps_regex``
+        - cache_size: int -> maximum size of the cache directory in bytes
         - **kwargs: dict -> additional arguments to be passed to the ``get_data`` method of the EOProduct (``common_params``)
 
     Returns:
     -------
         - data: xarray.DataArray -> xarray DataArray containing the loaded band
     '''
-    regex = band_2_regex(band)
-    for r in regex:
-        try:
-            data = product.get_data(band=r, **kwargs)
-            return data
-        except:
-            AddressNotFound
+    data = _get_band_data(product, band, cache=cache, cache_size=cache_size, **kwargs)
+    return data
+
+##############################################
+# Mosaic
+##############################################
+
+# Rules to combine overlapping tiles in ``mosaic``
+MOSAIC_METHODS = ('first', 'last', 'min', 'max', 'mean')
+
+def _extent_bounds(extent) -> tuple[float, float, float, float]:
+    '''
+    Bounds (xmin, ymin, xmax, ymax) of an extent given as tuple or as dict with lonmin, latmin, lonmax and latmax.
+    '''
+    if isinstance(extent, dict):
+        return extent['lonmin'], extent['latmin'], extent['lonmax'], extent['latmax']
+    return tuple(extent)
+
+def mosaic_grid(paths:list[str], crs=None, resolution:float|tuple=None, extent=None) -> dict:
+    '''
+    Output grid of a mosaic from the ``common_params`` (crs, resolution and extent).
+    Parameters which are not given are taken from the tiles: the crs and the resolution of the first tile
+    and the union of the bounds of all tiles.
+
+    Params:
+    -------
+        - paths: list[str] -> filepaths of the tiles
+        - crs: -> crs of the mosaic (e.g.: CRS.from_epsg(4326))
+        - resolution: float|tuple -> pixel size (x, y) in units of the crs
+        - extent: tuple|dict -> (xmin, ymin, xmax, ymax) in the crs of the mosaic
+
+    Returns:
+    -------
+        - grid: dict -> crs, transform, width and height of the mosaic
+    '''
+    with rasterio.open(paths[0]) as src:
+        crs = src.crs if crs is None else crs
+        if resolution is None:
+            with rio_vrt.WarpedVRT(src, crs=crs) as vrt:
+                resolution = vrt.res
+
+    if extent is None:
+        bounds = []
+        for path in paths:
+            with rasterio.open(path) as src:
+                bounds.append(rio_warp.transform_bounds(src.crs, crs, *src.bounds, densify_pts=21))
+        bounds = np.array(bounds)
+        extent = (bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(), bounds[:, 3].max())
+
+    xres, yres = (resolution, resolution) if np.isscalar(resolution) else resolution
+    xmin, ymin, xmax, ymax = _extent_bounds(extent)
+    width = max(1, math.ceil(round((xmax - xmin) / xres, 6)))
+    height = max(1, math.ceil(round((ymax - ymin) / yres, 6)))
+    transform = rio_transform.from_origin(xmin, ymax, xres, yres)
+    return {'crs': crs, 'transform': transform, 'width': width, 'height': height}
+
+def _tile_window(path:str, grid:dict) -> tuple[int, int, int, int]|None:
+    '''
+    Pixel window (row_start, row_stop, col_start, col_stop) of a tile in the mosaic grid, None if they do not overlap.
+    '''
+    with rasterio.open(path) as src:
+        bounds = rio_warp.transform_bounds(src.crs, grid['crs'], *src.bounds, densify_pts=21)
+    window = rio_windows.from_bounds(*bounds, transform=grid['transform'])
+    row_start, col_start = max(0, math.floor(window.row_off)), max(0, math.floor(window.col_off))
+    row_stop = min(grid['height'], math.ceil(window.row_off + window.height))
+    col_stop = min(grid['width'], math.ceil(window.col_off + window.width))
+    if row_start >= row_stop or col_start >= col_stop:
+        return None
+    return row_start, row_stop, col_start, col_stop
+
+class _TileReaders:
+    '''
+    Warped views of the tiles on the mosaic grid. Rasterio datasets must not be shared between threads,
+    so every thread opens its own view of a tile (once) and reads its windows from it.
+    '''
+    def __init__(self, grid:dict, resampling:str='nearest'):
+        self.grid = grid
+        self.resampling = rio_enums.Resampling[resampling]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    def read(self, path:str, window) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Values and valid mask of a tile within a window of the mosaic grid. Only this window is read and warped.
+        '''
+        views = self._local.__dict__.setdefault('views', {})
+        if path not in views:
+            src = rasterio.open(path)
+            # Sentinel-2 marks pixels without data with 0, the jp2 files do not always declare it
+            nodata = src.nodata if src.nodata is not None else 0
+            views[path] = rio_vrt.WarpedVRT(src, crs=self.grid['crs'], transform=self.grid['transform'],
+                                            width=self.grid['width'], height=self.grid['height'],
+                                            resampling=self.resampling, src_nodata=nodata, nodata=nodata)
+            with self._lock:
+                self._opened += [views[path], src]
+        data = views[path].read(1, window=window, masked=True)
+        return np.ma.getdata(data), ~np.ma.getmaskarray(data)
+
+    def close(self) -> None:
+        for dataset in self._opened:
+            dataset.close()
+        self._opened.clear()
+
+def _combine(method:str, values:np.ndarray, filled:np.ndarray, data:np.ndarray, valid:np.ndarray) -> None:
+    '''
+    Combine the values of a tile into the values of a mosaic window (in place) with the given rule.
+    For 'mean' the values hold the sum and filled the number of valid tiles per pixel.
+    '''
+    if method == 'mean':
+        values[valid] += data[valid]
+        filled += valid
+        return
+    if method == 'first':
+        take = valid & ~filled
+    elif method == 'last':
+        take = valid
+    elif method == 'min':
+        take = valid & (~filled | (data < values))
+    else:
+        take = valid & (~filled | (data > values))
+    values[take] = data[take]
+    filled |= valid
+
+def mosaic(products, band:str, method:str='first', window_size:int=1024, workers:int=1, path:str=None,
+           resampling:str='nearest', crs=None, resolution:float|tuple=None, extent=None) -> xr.DataArray:
+    '''
+    Mosaic a band of several (downloaded) products, e.g. neighbouring tiles, on a common grid (replaces ``merge_arrays``).
+    The grid is computed from the ``common_params`` and filled window by window: for every window only the
+    overlapping part of each tile is read and warped onto the grid, so the memory needed while mosaicking
+    depends on the window size and not on the number of tiles.
+    Usage: ``mosaic(products, 'B04', method='max', **common_params)``
+
+    Params:
+    -------
+        - products: SearchResult|list[EOProduct] -> downloaded products, their order is used by 'first' and 'last'
+        - band: str -> band to be mosaicked (e.g.: 'B04')
+        - method: str -> rule for overlapping pixels: 'first', 'last', 'min', 'max' or 'mean'
+        - window_size: int -> width and height of the windows in pixels
+        - workers: int -> number of tiles read at the same time for a window
+        - path: str -> filepath of a GeoTIFF, if given the windows are written to it and the file is returned lazily,
+                       so the mosaic is never completely in memory
+        - resampling: str -> resampling method of rasterio (e.g.: 'nearest', 'bilinear')
+        - crs: -> crs of the mosaic (``common_params``), default: crs of the first tile
+        - resolution: float|tuple -> pixel size in units of the crs (``common_params``), default: resolution of the first tile
+        - extent: tuple|dict -> (xmin, ymin, xmax, ymax) in the crs of the mosaic (``common_params``), default: all tiles
+
+    Returns:
+    -------
+        - data: xarray.DataArray -> mosaic with the dimensions y and x, pixels without data are set to nodata
+                                    (0 or the nodata of the tiles, NaN for 'mean')
+    '''
+    import rioxarray
+
+    if method not in MOSAIC_METHODS:
+        raise ValueError(f'method must be one of {MOSAIC_METHODS}, got {method!r}.')
+    paths = [resolve_band(product, band)[0] for product in products]
+    grid = mosaic_grid(paths, crs=crs, resolution=resolution, extent=extent)
+    tiles = [(tile, window) for tile, window in ((tile, _tile_window(tile, grid)) for tile in paths) if window is not None]
+
+    with rasterio.open(paths[0]) as src:
+        src_dtype = np.dtype(src.dtypes[0])
+        nodata = src.nodata if src.nodata is not None else 0
+    dtype = np.dtype(np.float32) if method == 'mean' else src_dtype
+    nodata = np.nan if method == 'mean' else nodata
+
+    height, width = grid['height'], grid['width']
+    windows = [(row, min(row + window_size, height), col, min(col + window_size, width))
+               for row in range(0, height, window_size) for col in range(0, width, window_size)]
+
+    values_all = None if path is not None else np.full((height, width), nodata, dtype=dtype)
+    dst = None
+    if path is not None:
+        dst = rasterio.open(path, 'w', driver='GTiff', height=height, width=width, count=1, dtype=dtype.name,
+                            crs=grid['crs'], transform=grid['transform'], nodata=nodata, compress='deflate',
+                            tiled=True, blockxsize=256, blockysize=256)
+    readers = _TileReaders(grid, resampling)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for row_start, row_stop, col_start, col_stop in windows:
+                # Tiles overlapping this window, in the order of the products
+                overlapping = [tile for tile, (r0, r1, c0, c1) in tiles
+                               if r0 < row_stop and row_start < r1 and c0 < col_stop and col_start < c1]
+                window = rio_windows.Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+                shape = (row_stop - row_start, col_stop - col_start)
+
+                values = np.zeros(shape, dtype=np.float64 if method == 'mean' else src_dtype)
+                filled = np.zeros(shape, dtype=np.int64 if method == 'mean' else bool)
+                for data, valid in pool.map(lambda tile: readers.read(tile, window), overlapping):
+                    _combine(method, values, filled, data, valid)
+
+                if method == 'mean':
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        values = (values / filled).astype(dtype)
+                else:
+                    values[~filled] = nodata
+
+                if dst is not None:
+                    dst.write(values, 1, window=window)
+                else:
+                    values_all[row_start:row_stop, col_start:col_stop] = values
+    finally:
+        readers.close()
+        if dst is not None:
+            dst.close()
+
+    if path is not None:
+        data = rioxarray.open_rasterio(path, masked=False).squeeze('band', drop=True)
+    else:
+        xs, _ = rio_transform.xy(grid['transform'], np.zeros(width, dtype=int), np.arange(width))
+        _, ys = rio_transform.xy(grid['transform'], np.arange(height), np.zeros(height, dtype=int))
+        data = xr.DataArray(values_all, dims=('y', 'x'), coords={'y': np.asarray(ys), 'x': np.asarray(xs)})
+        data = data.rio.write_crs(grid['crs']).rio.write_transform(grid['transform']).rio.write_nodata(nodata)
+    data.name = band
+    return data
 
 ##############################################
 # Reverse Search functions
@@ -271,7 +1330,18 @@ def extract_infos_from_filename(file:Path|str) -> dict:
     data['tile'] = id.split('_')[5].lstrip('T')
     return data
 
-def search_for_file(file:Path|str, provider:str='cop_dataspace') -> EOProduct|None:
+def _file_id(file:Path|str) -> str:
+    '''
+    Returns the product id (filename) of a Path object or string.
+    '''
+    if isinstance(file, Path):
+        return file.name
+    elif isinstance(file, str):
+        return file
+    else:
+        raise TypeError('Please provide a Path object or a string.')
+
+def search_for_file(file:Path|str, provider:str='cop_dataspace', dag:EODataAccessGateway=None) -> EOProduct|None:
     '''
     Searches for a file in the EODAG database based on the filename.
 
@@ -279,20 +1349,16 @@ def search_for_file(file:Path|str, provider:str='cop_dataspace') -> EOProduct|No
     -------
         - file (Path|str): Path object or string following the naming convention
         - provider (str): Provider to search for the file
+        - dag (EODataAccessGateway): Gateway used for the search (a new one is created if None)
         
     Returns:
     -------
         - found_product (EOProduct): EOProduct object found in the database
     '''
-    dag = EODataAccessGateway()
+    if dag is None:
+        dag = eodag.EODataAccessGateway()
 
-    if type(file) != str:
-        id = file.name
-    elif type(file) == str:
-        id = file
-    else:
-        raise TypeError('Please provide a Path object or a string.')
-    
+    id = _file_id(file)
     data = extract_infos_from_filename(id)
     search_results, _ = dag.search(
         productType=data['product_type'],
@@ -303,33 +1369,213 @@ def search_for_file(file:Path|str, provider:str='cop_dataspace') -> EOProduct|No
         cloudCover=100 
     )
 
-    
-    
     for found_product in search_results:
+        if found_product.properties.get('id') == id:
+            return found_product
+    print('No matching file found.')
+    return None
+
+def group_files_for_search(directory:list[Path]|list[str], window_days:int=31) -> list[dict]:
+    '''
+    Groups files by product type and tile and splits every group into date windows,
+    so that all files of a group can be found with a single search.
+
+    Params:
+    -------
+        - directory (list[Path]|list[str]): List of Path objects or strings following the naming convention
+        - window_days (int): Maximum number of days covered by a single search
+
+    Returns:
+    -------
+        - groups (list[dict]): One dictionary per search with the keys 
+          ``product_type``, ``tile``, ``start_date``, ``end_date`` and ``ids``
+    '''
+    # Group the files by product type and tile
+    by_tile = {}
+    for file in directory:
+        id = _file_id(file)
+        data = extract_infos_from_filename(id)
+        by_tile.setdefault((data['product_type'], data['tile']), []).append((data['start_date'], data['end_date'], id))
+
+    # Split each group into windows of at most window_days
+    groups = []
+    for (product_type, tile), files in by_tile.items():
+        files.sort()
+        window_start = None
+        for start_date, end_date, id in files:
+            date = dt.datetime.strptime(start_date, '%Y-%m-%d')
+            if window_start is None or (date - window_start).days >= window_days:
+                window_start = date
+                groups.append({'product_type': product_type, 'tile': tile, 
+                               'start_date': start_date, 'end_date': end_date, 'ids': []})
+            groups[-1]['end_date'] = end_date
+            groups[-1]['ids'].append(id)
+    return groups
+
+def search_group(group:dict, provider:str='cop_dataspace', dag:EODataAccessGateway=None) -> dict:
+    '''
+    Issues a single search for a group of files (see ``group_files_for_search``) and 
+    matches the found products with the ids of the group.
+
+    Params:
+    -------
+        - group (dict): Group of files returned by ``group_files_for_search``
+        - provider (str): Provider to search for the files
+        - dag (EODataAccessGateway): Gateway used for the search (a new one is created if None)
+
+    Returns:
+    -------
+        - found (dict): Dictionary {id: EOProduct} of the found files of the group
+    '''
+    if dag is None:
+        dag = eodag.EODataAccessGateway()
+
+    # search_all takes care of the pagination, a window can contain more products than a single page
+    search_results = dag.search_all(
+        productType=group['product_type'],
+        provider=provider,
+        tileIdentifier=group['tile'],
+        start=group['start_date'],
+        end=group['end_date'],
+        cloudCover=100
+    )
+    by_id = {product.properties.get('id'): product for product in search_results}
+    found = {id: by_id[id] for id in group['ids'] if id in by_id}
+    return found
+
+def _search_with_retry(group:dict, provider:str, dag:EODataAccessGateway, retries:int=0, backoff:float=1.0) -> dict:
+    '''
+    Calls ``search_group`` and retries failed requests with an exponential backoff.
+
+    Params:
+    -------
+        - group (dict): Group of files returned by ``group_files_for_search``
+        - provider (str): Provider to search for the files
+        - dag (EODataAccessGateway): Gateway used for the search
+        - retries (int): Number of retries after a failed request
+        - backoff (float): Seconds to wait before the first retry, doubled for every further retry
+
+    Returns:
+    -------
+        - found (dict): Dictionary {id: EOProduct} of the found files of the group
+    '''
+    for attempt in range(retries + 1):
         try:
-            if found_product.properties['id'] == id:
-                return found_product
-        except:
-            print('No matching file found.')
-            return None
-        
-def directory_to_search_results(directory:list[Path]|list[str], provider:str='cop_dataspace') -> SearchResult:
+            return search_group(group, provider=provider, dag=dag)
+        except (eodag_exceptions.RequestError, OSError):
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2**attempt)
+
+def search_groups(groups:list[dict], provider:str='cop_dataspace', dag:EODataAccessGateway=None, workers:int=1,
+                  retries:int=0, backoff:float=1.0, timeout:float=None, dag_factory:Callable=None) -> dict:
+    '''
+    Searches for multiple groups of files (see ``group_files_for_search``), optionally concurrently on a thread pool.
+    eodag keeps one search plugin per provider, which holds the state of the running query (parameters, pagination),
+    so a gateway must not be shared by concurrent searches: on the thread pool every thread uses its own gateway.
+
+    Params:
+    -------
+        - groups (list[dict]): Groups of files returned by ``group_files_for_search``
+        - provider (str): Provider to search for the files
+        - dag (EODataAccessGateway): Gateway used if the searches run one after another (a new one is created if None).
+                                     Any object with a ``search_all`` method can be used, e.g. a local stub for testing,
+                                     such objects (but not EODataAccessGateways) are shared by the threads of the pool.
+        - workers (int): Maximum number of searches running at the same time
+        - retries (int): Number of retries after a failed request (``RequestError`` or network errors)
+        - backoff (float): Seconds to wait before the first retry, doubled for every further retry
+        - timeout (float): Maximum number of seconds for all searches. Groups which did not finish in time are skipped
+                           and queued searches are cancelled, but searches which are already running cannot be 
+                           interrupted and finish in the background (on their own gateway). The timeout of a single
+                           request is set in the eodag provider config (``search: timeout``).
+        - dag_factory (Callable): Creates the gateway of every thread of the pool, e.g. to use a customised config
+                                  (default: ``eodag.EODataAccessGateway``)
+
+    Returns:
+    -------
+        - found (dict): Dictionary {id: EOProduct} of all found files
+    '''
+    found = {}
+    if workers == 1 and timeout is None:
+        if dag is None:
+            dag = eodag.EODataAccessGateway()
+        for group in groups:
+            found.update(_search_with_retry(group, provider=provider, dag=dag, retries=retries, backoff=backoff))
+        return found
+
+    if dag_factory is None:
+        shared = dag is not None and not isinstance(dag, eodag.EODataAccessGateway)
+        dag_factory = (lambda: dag) if shared else eodag.EODataAccessGateway
+    local = threading.local()
+
+    def search(group:dict) -> dict:
+        # One gateway per thread, created at the first search of the thread
+        if not hasattr(local, 'dag'):
+            local.dag = dag_factory()
+        return _search_with_retry(group, provider=provider, dag=local.dag, retries=retries, backoff=backoff)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = {pool.submit(search, group): group for group in groups}
+    done, not_done = wait(futures, timeout=timeout)
+    # Do not wait for searches which are still running after the timeout
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    # Update in submission order, so the result does not depend on which search finished first
+    for future, group in futures.items():
+        if future in done:
+            found.update(future.result())
+        else:
+            print(f'Search for tile {group["tile"]} ({group["start_date"]} to {group["end_date"]}) timed out.')
+    return found
+
+def directory_to_search_results(directory:list[Path]|list[str], provider:str='cop_dataspace', 
+                                dag:EODataAccessGateway=None, batched:bool=True, window_days:int=31,
+                                workers:int=1, retries:int=0, backoff:float=1.0, timeout:float=None,
+                                dag_factory:Callable=None) -> SearchResult:
     '''
     Searches for all files in a directory in the EODAG database based on the filename.
     Returns a SearchResult object with all found files.
+    By default files are grouped by product type, tile and date window (see ``group_files_for_search``),
+    and every group is searched once. With ``workers`` > 1 the searches run concurrently (one gateway per thread).
 
     Params:
     -------
         - directory (list[Path]|list[str]): List of Path objects or strings following the naming convention
         - provider (str): Provider to search for the files
+        - dag (EODataAccessGateway): Gateway used if the searches run one after another (a new one is created if None)
+        - batched (bool): If False, every file is searched on its own (one search per file)
+        - window_days (int): Maximum number of days covered by a single search if ``batched``
+        - workers (int): Maximum number of searches running at the same time
+        - retries (int): Number of retries after a failed request
+        - backoff (float): Seconds to wait before the first retry, doubled for every further retry
+        - timeout (float): Maximum number of seconds for all searches, unfinished searches are skipped 
+                           (see ``search_groups``)
+        - dag_factory (Callable): Creates the gateway of every thread if ``workers`` > 1 (see ``search_groups``)
 
     Returns:
     -------
-        - results (SearchResult): SearchResult object with all found files
+        - results (SearchResult): SearchResult object with all found files (in the order of ``directory``)
     '''
-    results = SearchResult([])
+    directory = list(directory)
+    if batched:
+        groups = group_files_for_search(directory, window_days=window_days)
+    else:
+        # One group (and therefore one search) per file
+        groups = [group for file in directory for group in group_files_for_search([file])]
+
+    found = search_groups(groups, provider=provider, dag=dag, workers=workers,
+                          retries=retries, backoff=backoff, timeout=timeout, dag_factory=dag_factory)
+
+    results = eodag.SearchResult([])
     for file in directory:
-        result = search_for_file(file=file, provider=provider)
-        if result:
-            results.append(result)
-    return results
\ No newline at end of file
+        id = _file_id(file)
+        if id in found:
+            results.append(found[id])
+        else:
+            print(f'No matching file found for {id}.')
+    return results
+
+
+# The module overwrites ``__name__``, so the functions are pointed to the real module path once,
+# which lets pickle send them to a process pool or dask cluster (e.g. ``_load_band_regex``, ``scl_valid_mask``)
+restore_module_names(globals())
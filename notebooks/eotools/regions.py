@@ -8,6 +8,8 @@ It allows the user to define Regions of Interest and export them as geojson file
 aswell as an png Image. The usage of QGIS in this exercies is therefore unnecessary.
 '''
 
+from __future__ import annotations
+
 # Variables
 __name__ = 'regions'
 __version__ = '20-Jun-2024_v01'
@@ -15,14 +17,16 @@ __version__ = '20-Jun-2024_v01'
 # Modules
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Button
-import matplotlib.image as mpimg
-import ipywidgets as widgets
-from IPython.display import display
 from shapely.geometry import Point, Polygon
 import json
-import xarray as xr
+from .lazy import lazy_import
+from .spatial import PolygonStore, dataset_bounds
+
+# Heavy dependencies (plotting and widgets) are imported at their first use
+plt = lazy_import('matplotlib.pyplot')
+widgets = lazy_import('ipywidgets')
+ipython_display = lazy_import('IPython.display')
+xr = lazy_import('xarray')
 
 
 # Functions
@@ -212,13 +216,10 @@ def roi(canvas:np.array ,ds:xr.Dataset , title='Regions of Interest', figsize=(8
 
                     # If the clicked points list is empty it is possible to delete a finished polygon by clicking inside of it
                     else:
-                        clicked_polygon = None
                         point = Point(clicked_point)  # A shapely point object is created out of the clicked point
 
-                        # If a finished polygon contains the point which is clicked it is removed out of the dictionary
-                        for polygon in polygons:
-                            if polygon['polygon'].contains(point):
-                                polygons.remove(polygon)
+                        # If finished polygons contain the point which is clicked they are removed out of the store (spatial index query)
+                        polygons.remove_containing(point)
 
                         # The plot gets redrawn
                         redraw(polygons)
@@ -343,7 +344,7 @@ def roi(canvas:np.array ,ds:xr.Dataset , title='Regions of Interest', figsize=(8
         plt.savefig(filepath, dpi=200)
 
     ### The starting settings are defined ###
-    polygons = []
+    polygons = PolygonStore(key='polygon')
     polygon_dict = {}
     clicked_points = []
     line_segments = []
@@ -380,7 +381,8 @@ def roi(canvas:np.array ,ds:xr.Dataset , title='Regions of Interest', figsize=(8
     buttons_box5 = widgets.VBox([buttons_box1, buttons_box2, buttons_box3])
 
     ### The image is plotted with the correct x- and y-axis ###
-    xyext = (ds.coords['x'].min(), ds.coords['x'].max(), ds.coords['y'].min(), ds.coords['y'].max()) # Left, Right, Bottom, Top
+    xmin, ymin, xmax, ymax = dataset_bounds(ds)
+    xyext = (xmin, xmax, ymin, ymax) # Left, Right, Bottom, Top
     fig, ax = plt.subplots(figsize=figsize)
     #canvas.plot.imshow(ax=ax, extent=xyext)
     ax.imshow(canvas, extent=(xyext))
@@ -389,7 +391,7 @@ def roi(canvas:np.array ,ds:xr.Dataset , title='Regions of Interest', figsize=(8
     ### If there is a mouseclick on the image it is connected with the on image click function, also the buttons boxes are displayed ###
     cid = fig.canvas.mpl_connect('button_press_event', on_image_click)
     box = widgets.HBox([buttons_box5])
-    display(box)
+    ipython_display.display(box)
 
 
 def remove_empty_polygons(poly_dict):
@@ -6,6 +6,8 @@ In here you will find all the necessary functions to shorten the notebooks and t
 
 
 
+from __future__ import annotations
+
 #Variables:
 __name__ = 'shortcut'
 __version__ = '20-Jun-2024_v01'
@@ -14,11 +16,22 @@ __version__ = '20-Jun-2024_v01'
 
 #Modules:
 import os
+import math
 import yaml
-import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
-from eodag import EODataAccessGateway, SearchResult, EOProduct
+import hashlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING
+from .lazy import lazy_import
+from .snapshot import SNAPSHOT_SUFFIX, Snapshot, serialize_snapshot
+
+# Heavy dependencies are imported at their first use
+plt = lazy_import('matplotlib.pyplot')
+mpimg = lazy_import('matplotlib.image')
+
+if TYPE_CHECKING:
+    from eodag import EODataAccessGateway, SearchResult, EOProduct
 
 
 def read_paths(filepath:str = "paths.yml") -> dict:
@@ -68,40 +81,129 @@ def configure(dag:EODataAccessGateway, secrets:dict, paths:dict) -> EODataAccess
     print(f'EODAG has been configured.')
     return dag
 
-def plot_quicklooks(products:SearchResult|list[EOProduct]) -> None:
+# In-process cache of decoded quicklook thumbnails: key -> np.ndarray
+_thumbnails = {}
+
+def quicklook_key(product:EOProduct) -> str:
+    '''
+    Key of the quicklook of a product in the thumbnail cache (sha1 of the quicklook link, or of the product id).
     '''
-    Plot the quicklooks of the products.
+    source = product.properties.get('quicklook') or product.properties['id']
+    return hashlib.sha1(source.encode()).hexdigest()
+
+def quicklook_thumbnail(product:EOProduct, cache_dir:str=None, size:int=256) -> np.ndarray:
+    '''
+    Get the decoded and downsampled quicklook of a product.
+    The quicklook is downloaded and decoded only once: thumbnails are kept in memory and,
+    if ``cache_dir`` is given, stored as small NumPy arrays which are reused in later sessions.
+
+    Params:
+    -------
+        - product: EOProduct -> product of a SearchResult
+        - cache_dir: str -> directory of the thumbnail cache (e.g. ``os.path.join(workspace['cache'], 'quicklooks')``)
+        - size: int -> maximum width/height of the thumbnail in pixels
+
+    Returns:
+    --------
+        - img: np.ndarray -> thumbnail
+    '''
+    key = f'{quicklook_key(product)}_{size}'
+    if key in _thumbnails:
+        return _thumbnails[key]
+
+    path = os.path.join(cache_dir, f'{key}.npy') if cache_dir is not None else None
+    if path is not None and os.path.exists(path):
+        img = np.load(path)
+    else:
+        # This line takes care of downloading the quicklook
+        img = mpimg.imread(product.get_quicklook())
+        step = max(1, math.ceil(max(img.shape[:2]) / size))
+        img = np.ascontiguousarray(img[::step, ::step])
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.tmp.npy'
+            np.save(tmp, img)
+            os.replace(tmp, path)
+
+    _thumbnails[key] = img
+    return img
+
+def plot_quicklooks(products:SearchResult|list[EOProduct], page:int=0, per_page:int=12, workers:int=8,
+                    cache_dir:str=None, size:int=256) -> None:
+    '''
+    Plot the quicklooks of the products, one page at a time.
+    The quicklooks of a page are fetched concurrently and cached (see ``quicklook_thumbnail``),
+    so revisiting a page draws it right away.
 
     Params:
     -------
         - products: SearchResult -> SearchResult object containing the products
+        - page: int -> page to plot (0 shows the first ``per_page`` products)
+        - per_page: int -> number of quicklooks per page (default=12)
+        - workers: int -> number of quicklooks fetched at the same time
+        - cache_dir: str -> directory of the persistent thumbnail cache (default: only in memory)
+        - size: int -> maximum width/height of the thumbnails in pixels
 
     Returns:
     --------
         - None
         - Shows the quicklooks of the products
     '''
-    fig = plt.figure(figsize=(10,8))
-    for i, product in enumerate(products[:12]):
-        # This line takes care of downloading the quicklook
-        quicklook_path = product.get_quicklook()
-        
+    start = page * per_page
+    selection = list(products[start:start + per_page])
+    if len(selection) == 0:
+        print(f'Page {page} is empty ({len(products)} products).')
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        images = list(pool.map(lambda product: quicklook_thumbnail(product, cache_dir, size), selection))
+
+    ncols = 4
+    nrows = math.ceil(len(selection) / ncols)
+    fig = plt.figure(figsize=(10, 8 * nrows / 3))
+    for i, (product, img) in enumerate(zip(selection, images)):
         date = product.properties['startTimeFromAscendingNode'][:16]
         provider = product.provider
         tile = product.properties['title'].split('_')[5].lstrip('T')
     
         # Plot the quicklook
-        img = mpimg.imread(quicklook_path)
-        ax = fig.add_subplot(3, 4, i+1)
-        ax.set_title(f'Product {i}\n{date}\n{provider} - {tile}')
+        ax = fig.add_subplot(nrows, ncols, i+1)
+        ax.set_title(f'Product {start + i}\n{date}\n{provider} - {tile}')
         ax.tick_params(top=False, bottom=False, left=False, right=False,
                        labelleft=False, labelbottom=False)
         plt.imshow(img)
     plt.tight_layout()
 
+    pages = math.ceil(len(products) / per_page)
+    if pages > 1:
+        print(f'Page {page} of pages 0 to {pages - 1} (products {start} to {start + len(selection) - 1} of {len(products)}).')
+
+def serialize(products:SearchResult|list[EOProduct], filename:str, workspace:str, dag:EODataAccessGateway) -> str:
+    '''
+    Serialize the Search Results. Filenames with the suffix .arrow are written as binary snapshot
+    (see ``eotools.snapshot``), which is much faster to deserialize, all others as GeoJSON by ``dag.serialize``.
+
+    Params:
+    -------
+        - products: SearchResult -> SearchResult object containing the products
+        - filename: str -> Filename of the serialized file (e.g. "search_results.arrow" or "search_results.geojson")
+        - workspace: str -> Filepath to the workspace (directory where the serialized file is stored)
+        - dag: EODataAccessGateway -> EODAG Object
+
+    Returns:
+    --------
+        - Filepath of the serialized file
+    '''
+    output_file = os.path.join(workspace['serialize'], filename)
+    if output_file.endswith(SNAPSHOT_SUFFIX):
+        return serialize_snapshot(products, output_file)
+    return dag.serialize(products, filename=output_file)
+
 def deserialize(filename:str, workspace:str, dag:EODataAccessGateway, log=True) -> SearchResult|list[EOProduct]:
     '''
     Deserialize and register the Search Results.
+    Snapshots (suffix .arrow, see ``serialize``) are memory-mapped and the products are only built and
+    registered when they are accessed, GeoJSON files are read completely by ``dag.deserialize_and_register``.
 
     Params:
     -------
@@ -112,15 +214,16 @@ def deserialize(filename:str, workspace:str, dag:EODataAccessGateway, log=True)
 
     Returns:
     --------
-        - Deserialized SearchResult object
+        - Deserialized SearchResult object (a ``Snapshot`` for .arrow files)
     '''
     # Deserialize the Search Results
     output_file = os.path.join(workspace['serialize'], filename)
-    deserialized_search_results = dag.deserialize_and_register(output_file)
+    if output_file.endswith(SNAPSHOT_SUFFIX):
+        deserialized_search_results = Snapshot(output_file, dag)
+    else:
+        deserialized_search_results = dag.deserialize_and_register(output_file)
 
     if log:
         print(f"Got {len(deserialized_search_results)} deserialized products.")
 
     return deserialized_search_results
-
-
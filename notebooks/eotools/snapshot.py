@@ -0,0 +1,236 @@
+#Description
+'''
+This script is intended to simplify further processes in your code.
+In here you will find a binary snapshot format for search results (Arrow IPC file), which is a faster
+companion of the GeoJSON files of ``dag.serialize``/``dag.deserialize_and_register``:
+the snapshot is memory-mapped on opening and the EOProducts are only built (and registered) when they are accessed.
+'''
+
+
+
+from __future__ import annotations
+
+#Variables:
+__name__ = 'snapshot'
+__version__ = '20-Jun-2024_v01'
+
+
+
+#Modules:
+import os
+import json
+import shapely
+from collections.abc import Sequence
+from shapely.geometry import shape
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+from .lazy import lazy_import
+
+# Heavy dependencies are imported at their first use
+pa = lazy_import('pyarrow')
+eodag = lazy_import('eodag')
+
+if TYPE_CHECKING:
+    from eodag import EODataAccessGateway, SearchResult, EOProduct
+
+
+# File extension of the snapshots
+SNAPSHOT_SUFFIX = '.arrow'
+
+# Properties stored as own columns, so they can be read without building the products
+COLUMNS = {'title': 'title', 'start': 'startTimeFromAscendingNode', 'cloud_cover': 'cloudCover'}
+
+
+def _schema(metadata:dict=None):
+    fields = [pa.field(column, pa.string()) for column in ['id', 'title', 'provider', 'product_type', 'start']]
+    fields += [pa.field('cloud_cover', pa.float64()), pa.field('geometry', pa.binary()), pa.field('feature', pa.string())]
+    return pa.schema(fields, metadata={'eotools:search': json.dumps(metadata or {})})
+
+def _float(value) -> float|None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def write_snapshot(features:list[dict], path:str, metadata:dict=None) -> str:
+    '''
+    Writes GeoJSON features (``product.as_dict()``) as snapshot. The file is written uncompressed,
+    so it can be memory-mapped, and replaced atomically.
+
+    Params:
+    -------
+        - features: list[dict] -> GeoJSON features of the products
+        - path: str -> filepath of the snapshot (.arrow)
+        - metadata: dict -> metadata of the search (e.g. number_matched)
+
+    Returns:
+    -------
+        - path: str
+    '''
+    properties = [feature.get('properties', {}) for feature in features]
+    geometries = shapely.to_wkb([shape(feature['geometry']) for feature in features])
+    columns = {
+        'id': [feature.get('id', props.get('id')) for feature, props in zip(features, properties)],
+        'title': [props.get(COLUMNS['title']) for props in properties],
+        'provider': [props.get('eodag_provider', props.get('eodag:provider')) for props in properties],
+        'product_type': [props.get('eodag_product_type', feature.get('collection'))
+                         for feature, props in zip(features, properties)],
+        'start': [props.get(COLUMNS['start']) for props in properties],
+        'cloud_cover': [_float(props.get(COLUMNS['cloud_cover'])) for props in properties],
+        'geometry': list(geometries),
+        'feature': [json.dumps(feature, default=str) for feature in features],
+    }
+    schema = _schema(metadata)
+    table = pa.table({name: pa.array(columns[name], type=schema.field(name).type) for name in schema.names}, schema=schema)
+
+    tmp = f'{path}.tmp'
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+def serialize_snapshot(products:SearchResult|list[EOProduct], path:str) -> str:
+    '''
+    Writes search results as snapshot (fast companion of ``dag.serialize``).
+
+    Params:
+    -------
+        - products: SearchResult|list[EOProduct] -> products to save
+        - path: str -> filepath of the snapshot (.arrow)
+
+    Returns:
+    -------
+        - path: str
+    '''
+    metadata = {'number_matched': getattr(products, 'number_matched', None)}
+    return write_snapshot([product.as_dict() for product in products], path, metadata)
+
+def geojson_to_snapshot(geojson_path:str, path:str=None) -> str:
+    '''
+    Converts a GeoJSON file of ``dag.serialize`` into a snapshot, without building the products.
+
+    Params:
+    -------
+        - geojson_path: str -> filepath of the serialized search results
+        - path: str -> filepath of the snapshot (default: same name with the suffix .arrow)
+
+    Returns:
+    -------
+        - path: str
+    '''
+    if path is None:
+        path = os.path.splitext(geojson_path)[0] + SNAPSHOT_SUFFIX
+    with open(geojson_path) as f:
+        collection = json.load(f)
+    # Metadata of the search as written by eodag 3 ('properties') or eodag 4 ('metadata')
+    properties = collection.get('properties') or {}
+    number_matched = (collection.get('metadata') or {}).get('eodag:number_matched', properties.get('eodag_search_matched'))
+    metadata = {'number_matched': number_matched}
+    return write_snapshot(collection.get('features', []), path, metadata)
+
+def _register_plugins(product:EOProduct, dag:EODataAccessGateway, plugins:dict) -> None:
+    '''
+    Registers the download and authentication plugins of the product (as ``dag.deserialize_and_register``
+    of eodag < 4). The plugins are looked up once per provider and host of the download link and kept in ``plugins``.
+    '''
+    key = (product.provider, urlparse(product.remote_location or '').netloc)
+    if key not in plugins:
+        # eodag < 4 has no public way to register a single product, the plugin manager is used instead
+        manager = dag._plugins_manager
+        downloader = manager.get_download_plugin(product)
+        if int(eodag.__version__.split('.')[0]) < 3:
+            auth = manager.get_auth_plugin(product.provider)
+        else:
+            auth = manager.get_auth_plugin(downloader, product)
+        plugins[key] = (downloader, auth)
+    downloader, auth = plugins[key]
+    product.register_downloader(downloader, product.downloader_auth or auth)
+
+def product_from_feature(feature:dict, dag:EODataAccessGateway=None, plugins:dict=None) -> EOProduct:
+    '''
+    Builds an EOProduct from its GeoJSON feature and registers its downloader, if a dag is given
+    (the same steps as ``dag.deserialize_and_register`` for a single product).
+
+    Params:
+    -------
+        - feature: dict -> GeoJSON feature of the product
+        - dag: EODataAccessGateway -> EODAG Object, if None the product is not registered
+        - plugins: dict -> plugins of the already registered products (eodag < 4), shared by all products of a snapshot
+
+    Returns:
+    -------
+        - product: EOProduct
+    '''
+    if hasattr(eodag.EOProduct, 'from_dict'):
+        # eodag >= 4 builds and registers the product in one step
+        return eodag.EOProduct.from_dict(feature, dag=dag)
+
+    product = eodag.EOProduct.from_geojson(feature)
+    if dag is not None and product.downloader is None:
+        _register_plugins(product, dag, {} if plugins is None else plugins)
+    return product
+
+class Snapshot(Sequence):
+    '''
+    Search results read from a snapshot. The file is memory-mapped and the EOProducts are built
+    at their first access (and then kept), so opening a snapshot with thousands of products is cheap.
+    Indexing returns EOProducts, slicing a list of EOProducts, like a SearchResult.
+    The columns (id, title, provider, product_type, start, cloud_cover) and the geometries
+    can be read without building any product.
+
+    Params:
+    -------
+        - path: str -> filepath of the snapshot (.arrow)
+        - dag: EODataAccessGateway -> EODAG Object to register the downloaders of the products
+    '''
+    def __init__(self, path:str, dag:EODataAccessGateway=None):
+        self.path = path
+        self.dag = dag
+        # The table references the memory map (no copy), so the map stays open with the Snapshot
+        self._source = pa.memory_map(path, 'r')
+        self._table = pa.ipc.open_file(self._source).read_all()
+        self.metadata = json.loads((self._table.schema.metadata or {}).get(b'eotools:search', b'{}'))
+        self.number_matched = self.metadata.get('number_matched')
+        self._products = {}
+        self._plugins = {}
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def __getitem__(self, idx:int|slice) -> EOProduct|list[EOProduct]:
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f'Product {idx} out of range ({len(self)} products).')
+        if idx not in self._products:
+            self._products[idx] = product_from_feature(self.feature(idx), self.dag, self._plugins)
+        return self._products[idx]
+
+    def __repr__(self) -> str:
+        return f'Snapshot({len(self)} products, {len(self._products)} built, path={self.path!r})'
+
+    def feature(self, idx:int) -> dict:
+        '''
+        GeoJSON feature of a product (without building the EOProduct).
+        '''
+        return json.loads(self._table.column('feature')[idx].as_py())
+
+    def column(self, name:str) -> list:
+        '''
+        Values of a column for all products (e.g. 'title', 'start' or 'cloud_cover').
+        '''
+        return self._table.column(name).to_pylist()
+
+    def geometries(self) -> list:
+        '''
+        Footprints of all products as shapely geometries.
+        '''
+        return list(shapely.from_wkb(self._table.column('geometry').to_numpy(zero_copy_only=False)))
+
+    def to_search_result(self) -> SearchResult:
+        '''
+        Builds all products and returns them as SearchResult.
+        '''
+        return eodag.SearchResult(list(self), number_matched=self.number_matched)
@@ -0,0 +1,139 @@
+#Description
+'''
+This script is intended to simplify further processes in your code.
+In here you will find the spatial helpers shared by ``geometry`` and ``regions``:
+the bounds of a Dataset, vectorized in-bounds checks for many polygons and a
+polygon store with a spatial index (STRtree) for fast point queries.
+'''
+
+
+
+from __future__ import annotations
+
+#Variables:
+__name__ = 'spatial'
+__version__ = '20-Jun-2024_v01'
+
+
+
+#Modules:
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import box
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+
+def dataset_bounds(ds:xr.Dataset|xr.DataArray) -> tuple[float, float, float, float]:
+    '''
+    Bounds of a Dataset from its x and y coordinates (pixel centers), computed once.
+
+    Params:
+    -------
+        - ds: xr.Dataset|xr.DataArray -> Dataset with the coordinates x and y
+
+    Returns:
+    -------
+        - bounds: tuple -> (xmin, ymin, xmax, ymax)
+    '''
+    x = ds.coords['x'].values
+    y = ds.coords['y'].values
+    return float(x.min()), float(y.min()), float(x.max()), float(y.max())
+
+def within_bounds(geometries:list, bounds:tuple) -> np.ndarray:
+    '''
+    Checks for many geometries at once, if they lie within the bounds (one vectorized shapely call).
+
+    Params:
+    -------
+        - geometries: list -> shapely geometries
+        - bounds: tuple -> (xmin, ymin, xmax, ymax), e.g. from ``dataset_bounds``
+
+    Returns:
+    -------
+        - mask: np.ndarray -> True for every geometry which is contained in the bounds
+    '''
+    bounding_box = box(*bounds)
+    shapely.prepare(bounding_box)
+    return shapely.contains(bounding_box, np.asarray(geometries, dtype=object))
+
+class PolygonStore:
+    '''
+    List of polygon records (dictionaries with a shapely polygon under ``key``) with a spatial index.
+    The STRtree is built lazily at the first query after the store has been changed, so adding polygons
+    stays cheap and point queries (e.g. clicks) need O(log n) instead of testing every polygon.
+
+    Params:
+    -------
+        - records: list -> initial records
+        - key: str -> key of the shapely geometry in the records (default='polygon')
+    '''
+    def __init__(self, records:list=None, key:str='polygon'):
+        self.key = key
+        self._records = list(records) if records is not None else []
+        self._tree = None
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, idx:int) -> dict:
+        return self._records[idx]
+
+    def append(self, record:dict) -> None:
+        self._records.append(record)
+        self._tree = None
+
+    def pop(self, idx:int=-1) -> dict:
+        self._tree = None
+        return self._records.pop(idx)
+
+    def clear(self) -> None:
+        self._records.clear()
+        self._tree = None
+
+    def _index(self) -> STRtree:
+        if self._tree is None:
+            self._tree = STRtree([record[self.key] for record in self._records])
+        return self._tree
+
+    def containing(self, point) -> list[int]:
+        '''
+        Indices of the records whose polygon contains the point, in the order of the store.
+
+        Params:
+        -------
+            - point: shapely.geometry.Point
+
+        Returns:
+        -------
+            - indices: list[int]
+        '''
+        if not self._records:
+            return []
+        return sorted(int(idx) for idx in self._index().query(point, predicate='within'))
+
+    def remove_containing(self, point) -> list[dict]:
+        '''
+        Removes all records whose polygon contains the point.
+
+        Params:
+        -------
+            - point: shapely.geometry.Point
+
+        Returns:
+        -------
+            - removed: list[dict] -> the removed records
+        '''
+        hits = set(self.containing(point))
+        if not hits:
+            return []
+        removed = [record for idx, record in enumerate(self._records) if idx in hits]
+        self._records = [record for idx, record in enumerate(self._records) if idx not in hits]
+        self._tree = None
+        return removed
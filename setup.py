@@ -23,7 +23,7 @@ def make_subdirs():
     with open('notebooks/paths.yml', 'w') as outfile:
         yaml.dump(data=paths, stream=outfile)
 
-    dirs = [paths[elem] for elem in ['serialize', 'post', 'shapefiles']]
+    dirs = [paths[elem] for elem in ['serialize', 'post', 'shapefiles', 'cache']]
 
     for d in dirs:
         dir_path = Path(d)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# eotools lives in the notebooks directory and is not installed as a package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'notebooks'))
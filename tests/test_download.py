@@ -0,0 +1,126 @@
+import io
+import os
+import zipfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from eotools import download
+
+
+TITLE = 'S2A_MSIL2A_20240501T100031_N0510_R122_T33UXP_20240501T150000'
+BANDS = ['B02', 'B03', 'B04', 'B08']
+
+
+def safe_zip(title:str) -> bytes:
+    '''
+    Zip archive of a product in SAFE format with random 10m band files.
+    '''
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for band in BANDS:
+            zf.writestr(f'{title}.SAFE/GRANULE/L2A/IMG_DATA/R10m/T33UXP_20240501T100031_{band}_10m.jp2', os.urandom(100_000))
+    return buffer.getvalue()
+
+
+class Handler(BaseHTTPRequestHandler):
+    '''
+    Serves the archives of the stub, supports Range requests and can drop the connection once per archive.
+    '''
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server.stub
+        title = self.path.strip('/')
+        data = stub['files'][title]
+        header = self.headers.get('Range')
+        stub['requests'].append((title, header))
+
+        start = int(header.split('=')[1].rstrip('-')) if header else 0
+        if start >= len(data):
+            self.send_response(416)
+            self.end_headers()
+            return
+        self.send_response(206 if header else 200)
+        self.send_header('Content-Length', str(len(data) - start))
+        self.end_headers()
+        if title in stub['drop']:
+            # Send only a part of the archive and close the connection
+            stub['drop'].discard(title)
+            self.wfile.write(data[start:start + len(data) // 2])
+            self.wfile.flush()
+            self.connection.close()
+            return
+        self.wfile.write(data[start:])
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.stub = {'files': {TITLE: safe_zip(TITLE)}, 'requests': [], 'drop': set(),
+                   'url': f'http://127.0.0.1:{server.server_port}'}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.stub
+    server.shutdown()
+    server.server_close()
+
+
+class Product:
+    '''
+    Minimal stand-in for an EOProduct.
+    '''
+    def __init__(self, title:str, url:str):
+        self.properties = {'title': title, 'downloadLink': f'{url}/{title}'}
+        self.remote_location = self.properties['downloadLink']
+        self.downloader_auth = None
+        self.location = None
+
+
+def test_resume_after_dropped_connection(stub, tmp_path):
+    stub['drop'].add(TITLE)
+    product = Product(TITLE, stub['url'])
+
+    root = download.download_product(product, tmp_path, bands=['B02', 'B08'], backoff=0)
+
+    assert download.is_complete(root, ['B02', 'B08'])
+    assert product.location == root.as_uri()
+    # The second request continues where the first one stopped
+    assert stub['requests'][0] == (TITLE, None)
+    offset = int(stub['requests'][1][1].split('=')[1].rstrip('-'))
+    assert 0 < offset <= len(stub['files'][TITLE]) // 2
+    assert len(stub['requests']) == 2
+    assert not (tmp_path / f'{TITLE}.zip').exists()
+    assert not (tmp_path / f'{TITLE}.zip.part').exists()
+
+
+def test_skip_complete_products(stub, tmp_path):
+    products = [Product(TITLE, stub['url'])]
+    download.download_products(products, tmp_path, bands=['B04'], backoff=0, log=False)
+    stub['requests'].clear()
+
+    roots = download.download_products(products, tmp_path, bands=['B04'], backoff=0, log=False)
+
+    assert stub['requests'] == []
+    assert roots == [tmp_path / TITLE]
+
+
+def test_missing_bands_are_retried_and_cleaned_up(stub, tmp_path):
+    product = Product(TITLE, stub['url'])
+
+    with pytest.raises(download.IncompleteProductError):
+        download.download_product(product, tmp_path, bands=['B05'], retries=2, backoff=0)
+
+    assert len(stub['requests']) == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_download_products_reports_failures(stub, tmp_path):
+    products = [Product(TITLE, stub['url']), Product('unknown', stub['url'])]
+
+    roots = download.download_products(products, tmp_path, retries=0, backoff=0, log=False)
+
+    assert roots[0] == tmp_path / TITLE
+    assert roots[1] is None
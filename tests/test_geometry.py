@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+import rioxarray  # noqa: F401 (registers the .rio accessor)
+import xarray as xr
+from rasterio.features import geometry_mask
+from shapely.geometry import Polygon, box
+
+from eotools import geometry
+
+
+def make_dataset(size:int=100, res:float=10.0) -> xr.Dataset:
+    '''
+    Dataset with one band on a regular grid (pixel centers), origin at (500000, 5400000).
+    '''
+    x = 500000 + res / 2 + res * np.arange(size)
+    y = 5400000 - res / 2 - res * np.arange(size)
+    values = np.arange(size * size, dtype=np.float32).reshape(size, size)
+    ds = xr.Dataset({'B02': (('y', 'x'), values)}, coords={'y': y, 'x': x})
+    return ds.rio.write_crs('EPSG:32633')
+
+
+@pytest.mark.parametrize('all_touched', [False, True])
+@pytest.mark.parametrize('polygon', [
+    Polygon([(500123, 5399877), (500377, 5399761), (500612, 5399403), (500244, 5399188), (500097, 5399512)]),
+    box(500003, 5399003, 500997, 5399997),
+    box(499500, 5399500, 500255, 5400500),
+])
+def test_clip_array_matches_full_mask(polygon, all_touched):
+    ds = make_dataset()
+    clipped = geometry.clip_array(ds, polygon, all_touched=all_touched)
+
+    full = geometry_mask([polygon], out_shape=(ds.sizes['y'], ds.sizes['x']), transform=ds.rio.transform(),
+                         all_touched=all_touched, invert=True)
+    expected = ds['B02'].where(xr.DataArray(full, dims=('y', 'x')))
+    assert int(clipped['B02'].notnull().sum()) == int(full.sum())
+    xr.testing.assert_equal(clipped['B02'], expected.sel(y=clipped['y'], x=clipped['x']))
+
+
+def test_clip_array_outside_raises():
+    with pytest.raises(ValueError):
+        geometry.clip_array(make_dataset(), box(400000, 5000000, 400100, 5000100))
@@ -0,0 +1,15 @@
+import pickle
+import types
+
+from eotools import loading
+
+
+def test_module_functions_can_be_pickled():
+    # loading overwrites __name__, every function defined in it has to point to the real module path
+    functions = [obj for obj in vars(loading).values()
+                 if isinstance(obj, types.FunctionType) and obj.__module__.endswith('loading')]
+
+    assert loading._load_band_regex in functions
+    for function in functions:
+        assert function.__module__ == 'eotools.loading'
+        assert pickle.loads(pickle.dumps(function)) is function
@@ -0,0 +1,124 @@
+import time
+import threading
+
+import pytest
+from eodag.utils.exceptions import RequestError
+
+from eotools import loading
+
+
+FILES = ['S2A_MSIL2A_20240501T100031_N0510_R122_T33UXP_20240501T150000',
+         'S2B_MSIL2A_20240503T100029_N0510_R122_T33UWP_20240503T140000',
+         'S2A_MSIL2A_20240511T100031_N0510_R122_T33UVP_20240511T150000']
+
+
+class Product:
+    '''
+    Minimal stand-in for an EOProduct.
+    '''
+    def __init__(self, id:str):
+        self.properties = {'id': id}
+
+
+class StubDag:
+    '''
+    Stand-in for an EODataAccessGateway: ``search_all`` returns the products of the requested tile.
+    Searches can fail a number of times (per tile) or block until ``release`` is set.
+    '''
+    def __init__(self, files:list[str], failures:dict=None, delays:dict=None, blocking:set=None):
+        self.products = {loading.extract_infos_from_filename(file)['tile']: Product(file) for file in files}
+        self.failures = dict(failures or {})
+        self.delays = delays or {}
+        self.blocking = blocking or set()
+        self.release = threading.Event()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def search_all(self, tileIdentifier:str, **kwargs):
+        with self.lock:
+            self.calls.append(tileIdentifier)
+            failures = self.failures.get(tileIdentifier, 0)
+            self.failures[tileIdentifier] = failures - 1
+        if failures > 0:
+            raise RequestError(f'Search for {tileIdentifier} failed.')
+        if tileIdentifier in self.blocking:
+            self.release.wait()
+        time.sleep(self.delays.get(tileIdentifier, 0))
+        return [self.products[tileIdentifier]]
+
+
+def test_retry_failed_searches():
+    dag = StubDag(FILES, failures={'33UXP': 2})
+    groups = loading.group_files_for_search(FILES)
+
+    found = loading.search_groups(groups, dag=dag, retries=2, backoff=0)
+
+    assert set(found) == set(FILES)
+    assert dag.calls.count('33UXP') == 3
+
+
+def test_raise_after_last_retry():
+    dag = StubDag(FILES, failures={'33UXP': 2})
+    groups = loading.group_files_for_search(FILES)
+
+    with pytest.raises(RequestError):
+        loading.search_groups(groups, dag=dag, retries=1, backoff=0)
+
+
+def test_timeout_skips_and_cancels_searches():
+    dag = StubDag(FILES, blocking={'33UXP'})
+    groups = loading.group_files_for_search(FILES)
+
+    start = time.perf_counter()
+    try:
+        found = loading.search_groups(groups, dag=dag, workers=1, timeout=0.2)
+    finally:
+        dag.release.set()
+
+    assert time.perf_counter() - start < 1
+    assert found == {}
+    # The searches which were still queued at the timeout are cancelled instead of being run
+    assert dag.calls == ['33UXP']
+
+
+def test_results_keep_the_order_of_the_files():
+    # The searches finish in the reverse order of the files
+    dag = StubDag(FILES, delays={'33UXP': 0.2, '33UWP': 0.1, '33UVP': 0})
+
+    results = loading.directory_to_search_results(FILES, dag=dag, workers=3)
+
+    assert [product.properties['id'] for product in results] == FILES
+
+
+class StatefulDag(StubDag):
+    '''
+    Stub which, like the search plugins of eodag, holds the state of the running query and fails on concurrent use.
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query = None
+
+    def search_all(self, tileIdentifier:str, **kwargs):
+        assert self.query is None, 'gateway used by concurrent searches'
+        self.query = tileIdentifier
+        try:
+            return super().search_all(tileIdentifier, **kwargs)
+        finally:
+            self.query = None
+
+
+def test_every_thread_uses_its_own_gateway():
+    dags = []
+    lock = threading.Lock()
+
+    def dag_factory():
+        dag = StatefulDag(FILES, delays={'33UXP': 0.1, '33UWP': 0.1, '33UVP': 0.1})
+        with lock:
+            dags.append(dag)
+        return dag
+
+    results = loading.directory_to_search_results(FILES, workers=3, dag_factory=dag_factory)
+
+    assert [product.properties['id'] for product in results] == FILES
+    assert len(dags) == 3
+    assert sorted(len(dag.calls) for dag in dags) == [1, 1, 1]
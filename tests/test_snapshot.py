@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+from eodag import EODataAccessGateway, EOProduct, SearchResult
+
+from eotools import snapshot
+
+
+@pytest.fixture(scope='module')
+def dag():
+    return EODataAccessGateway()
+
+
+@pytest.fixture(scope='module')
+def geojson(dag, tmp_path_factory):
+    products = [EOProduct('creodias', {'id': f'S2A_{i}', 'title': f'S2A_MSIL2A_20240501T100031_N0510_R122_T33UXP_{i}',
+                                       'startTimeFromAscendingNode': '2024-05-01T10:00:31Z', 'cloudCover': i,
+                                       'geometry': 'POLYGON((10 45,11 45,11 46,10 46,10 45))',
+                                       'downloadLink': f'https://zipper.creodias.eu/download/{i}'},
+                          productType='S2_MSI_L2A') for i in range(3)]
+    path = str(tmp_path_factory.mktemp('snapshot') / 'search.geojson')
+    dag.serialize(SearchResult(products), filename=path)
+    return path
+
+
+@pytest.fixture
+def eodag_3(monkeypatch):
+    '''
+    eodag without ``EOProduct.from_dict``, as in the versions before 4.
+    '''
+    product = SimpleNamespace(from_geojson=EOProduct.from_geojson)
+    monkeypatch.setattr(snapshot, 'eodag', SimpleNamespace(EOProduct=product, SearchResult=SearchResult, __version__='3.0.0'))
+
+
+def assert_same_product(product, expected):
+    assert product.properties == expected.properties
+    assert product.geometry.equals(expected.geometry)
+    assert product.provider == expected.provider
+    assert product.remote_location == expected.remote_location
+    # Same plugins as after deserialization, i.e. the product can be downloaded
+    assert product.downloader is not None
+    assert product.downloader is expected.downloader
+    assert product.downloader_auth is expected.downloader_auth
+
+
+@pytest.mark.parametrize('legacy', [False, True])
+def test_snapshot_products_equal_deserialized(dag, geojson, legacy, request):
+    if legacy:
+        request.getfixturevalue('eodag_3')
+    expected = dag.deserialize_and_register(geojson)
+    snap = snapshot.Snapshot(snapshot.geojson_to_snapshot(geojson), dag)
+
+    for product, expected_product in zip(snap, expected):
+        assert_same_product(product, expected_product)
+
+
+def test_snapshot_products_download(dag, geojson, monkeypatch):
+    snap = snapshot.Snapshot(snapshot.geojson_to_snapshot(geojson), dag)
+    product = snap[1]
+    calls = []
+    monkeypatch.setattr(product.downloader, 'download', lambda prod, *args, **kwargs: calls.append(prod) or '/tmp/product')
+
+    assert product.download() == '/tmp/product'
+    assert calls == [product]
+
+
+def test_plugins_are_looked_up_once_per_provider(dag, geojson, eodag_3, monkeypatch):
+    lookups = []
+    get_download_plugin = dag._plugins_manager.get_download_plugin
+    monkeypatch.setattr(dag._plugins_manager, 'get_download_plugin',
+                        lambda product: lookups.append(product) or get_download_plugin(product))
+    snap = snapshot.Snapshot(snapshot.geojson_to_snapshot(geojson), dag)
+
+    products = snap.to_search_result()
+
+    assert len(products) == 3
+    assert len(lookups) == 1